@@ -1,51 +1,172 @@
 import wave
+import struct
+import threading
+import time
 import pyaudio
-from pydub import AudioSegment
 import numpy as np
+from pcm_cache import PCMCache
+from seek_index import IndexedAudio, load_seek_index
+from perf_stats import perf_stats
+
+pcm_cache = PCMCache()  # 压缩格式解码结果的磁盘缓存
+
+def quantize_to_int16(samples, out, dither=False, scratch=None, rng=None):
+    """
+    把样本四舍五入、裁剪并量化为 int16，写入预分配的 out。
+    处理链内部使用浮点（默认 float32），只在输出前调用一次本函数。
+    :param samples: 输入样本（浮点或整数），不会被修改
+    :param out: 预分配的 int16 输出数组，形状与 samples 相同
+    :param dither: 是否加入 ±1 LSB 的三角分布（TPDF）抖动
+    :param scratch: 可选的预分配浮点临时数组，形状与 samples 相同
+    :param rng: 可选的 numpy 随机数生成器
+    :return: out
+    """
+    if samples.dtype.kind != 'f':
+        np.clip(samples, -32768, 32767, out=out, casting='unsafe')  # 整数样本无需舍入和抖动
+        return out
+    if scratch is None:
+        scratch = np.empty(samples.shape, dtype=samples.dtype)
+    if dither:
+        rng = np.random.default_rng() if rng is None else rng
+        np.add(samples, rng.random(samples.shape, dtype=scratch.dtype), out=scratch)
+        scratch -= rng.random(samples.shape, dtype=scratch.dtype)
+        np.clip(scratch, -32768, 32767, out=scratch)
+    else:
+        np.clip(samples, -32768, 32767, out=scratch)
+    np.rint(scratch, out=out, casting='unsafe')
+    return out
+
+def _find_wav_data_chunk(file_path):
+    """
+    遍历 RIFF 块，找到 PCM 数据块的偏移和长度（字节）。
+    """
+    with open(file_path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("Not a valid WAV file.")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("WAV file has no data chunk.")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'data':
+                return f.tell(), chunk_size
+            f.seek(chunk_size + (chunk_size & 1), 1)  # 块按偶数字节对齐
+
+def open_wav_memmap(file_path):
+    """
+    以内存映射方式打开 16 位 PCM WAV 文件，不把数据读入内存。
+    返回采样率和形状为 (帧数, 声道数) 的只读 numpy 数组。
+    """
+    with wave.open(file_path, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        n_channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+    if sample_width != 2:
+        raise ValueError("Only 16-bit PCM WAV files are supported.")
+
+    offset, data_size = _find_wav_data_chunk(file_path)
+    # 截断的文件里 data 块声明的长度可能超过实际文件长度
+    with open(file_path, 'rb') as f:
+        f.seek(0, 2)
+        data_size = min(data_size, f.tell() - offset)
+    n_frames = data_size // (2 * n_channels)
+    if n_frames == 0:
+        return sample_rate, np.zeros((0, n_channels), dtype=np.int16)
+    frames = np.memmap(file_path, dtype='<i2', mode='r', offset=offset, shape=(n_frames, n_channels))
+    return sample_rate, frames
+
+def decode_compressed(file_path, use_cache=True):
+    """
+    解码 MP3/AAC 文件，解码结果保存在磁盘缓存中，再次打开时直接内存映射。
+    返回采样率和形状为 (帧数, 声道数) 的 numpy 数组。
+    """
+    if use_cache:
+        cached = pcm_cache.load(file_path)
+        if cached is not None:
+            return cached
+
+    from pydub import AudioSegment  # 按需导入：只播放 WAV 时不加载 pydub
+    audio = AudioSegment.from_file(file_path)
+    sample_rate = audio.frame_rate
+    frames = np.array(audio.get_array_of_samples()).reshape(-1, audio.channels)
+    if use_cache:
+        try:
+            pcm_cache.store(file_path, sample_rate, frames)
+        except OSError:
+            pass  # 缓存目录不可写时仅跳过缓存
+    return sample_rate, frames
 
 def read_audio(file_path):
     """
     读取音频文件，支持 WAV、MP3 和 AAC 格式。
-    返回采样率、音频数据（numpy 数组）和时长（秒）。
+    返回采样率、音频数据（形状为 (样本数, 声道数) 的 numpy 数组，保留所有声道）和时长（秒）。
+    WAV 文件通过内存映射读取，返回的是文件数据的零拷贝视图。
     """
+    start = time.perf_counter()
     if file_path.endswith(".wav"):
-        with wave.open(file_path, 'rb') as wf:
-            sample_rate = wf.getframerate()
-            n_channels = wf.getnchannels()
-            n_frames = wf.getnframes()
-            audio_data = wf.readframes(n_frames)
-            audio_data = np.frombuffer(audio_data, dtype=np.int16)
-            if n_channels > 1:
-                audio_data = audio_data.reshape(-1, n_channels)[:, 0]  # 转为单声道
-            duration = n_frames / sample_rate
-        return sample_rate, audio_data, duration
+        sample_rate, audio_data = open_wav_memmap(file_path)
     elif file_path.endswith((".mp3", ".aac")):
-        audio = AudioSegment.from_file(file_path)
-        sample_rate = audio.frame_rate
-        audio_data = np.array(audio.get_array_of_samples())
-        if audio.channels > 1:
-            audio_data = audio_data.reshape(-1, audio.channels)[:, 0]  # 转为单声道
-        duration = len(audio) / 1000  # 转换为秒
-        return sample_rate, audio_data, duration
+        sample_rate, audio_data = decode_compressed(file_path)
     else:
         raise ValueError("Unsupported file format. Only WAV, MP3, and AAC are supported.")
+    perf_stats.record("decode", time.perf_counter() - start, len(audio_data), audio_data.nbytes, sample_rate)
+    duration = len(audio_data) / sample_rate
+    return sample_rate, audio_data, duration
 
-def play_audio(sample_rate, get_audio_data, stop_event, start_position):
+def open_audio(file_path):
+    """
+    快速打开音频文件，用于尽快开始播放。
+    WAV 和已有解码缓存的 MP3/AAC 与 read_audio 相同；没有缓存的 MP3/AAC 通过帧索引
+    返回按需解码的 IndexedAudio，播放只需解码当前位置附近的帧，完整解码（decode_compressed）由调用者在后台进行。
+    :return: (采样率, 音频数据, 时长（秒）, 是否仍需完整解码)
+    """
+    if file_path.endswith((".mp3", ".aac")) and pcm_cache.load(file_path) is None:
+        start = time.perf_counter()
+        audio_data = IndexedAudio(file_path, load_seek_index(file_path, pcm_cache))
+        perf_stats.record("open_indexed", time.perf_counter() - start, 0, 0, audio_data.sample_rate)
+        return audio_data.sample_rate, audio_data, audio_data.duration, True
+    sample_rate, audio_data, duration = read_audio(file_path)
+    return sample_rate, audio_data, duration, False
+
+def iter_audio_blocks(file_path, block_size=1024):
+    """
+    按固定大小逐块读取音频文件，内存占用与文件长度无关（WAV）。
+    :param file_path: 音频文件路径
+    :param block_size: 每块的样本数
+    :return: 生成器，依次产出形状为 (样本数, 声道数) 的音频块（最后一块可能不足 block_size）
+    """
+    if file_path.endswith(".wav"):
+        _, audio_data = open_wav_memmap(file_path)
+    else:
+        _, audio_data, _ = read_audio(file_path)
+    for i in range(0, len(audio_data), block_size):
+        yield audio_data[i:i + block_size]
+
+def play_audio(sample_rate, get_audio_data, stop_event, start_position, process_block=None, dither=False):
     """
     播放音频数据，支持动态更新和从指定位置继续播放。
     :param sample_rate: 采样率
-    :param get_audio_data: 函数，用于动态获取最新的音频数据
+    :param get_audio_data: 函数，用于动态获取最新的音频数据（一维单声道或 (样本数, 声道数) 数组）
     :param stop_event: threading.Event，用于控制停止播放
     :param start_position: 开始播放的位置（样本索引）
+    :param process_block: 可选函数，在写入声卡前对每个块进行滤波（如 Filter.process_block）
+    :param dither: 量化为 int16 时是否加入抖动
     """
+    audio_data = get_audio_data()
+    n_channels = audio_data.shape[1] if audio_data.ndim > 1 else 1
+
     p = pyaudio.PyAudio()
     stream = p.open(format=pyaudio.paInt16,
-                    channels=1,
+                    channels=n_channels,
                     rate=sample_rate,
                     output=True)
 
     chunk_size = 1024
     position = start_position
+    chunk_seconds = chunk_size / sample_rate
+    pcm = np.empty((chunk_size, n_channels), dtype=np.int16)  # 预分配的量化输出缓冲区
+    last_write = None  # 上一次写入完成的时间，用于检测写入是否晚于实时
 
     try:
         while not stop_event.is_set():
@@ -56,12 +177,21 @@ def play_audio(sample_rate, get_audio_data, stop_event, start_position):
                     break
 
                 chunk = audio_data[i:i + chunk_size]
-                chunk = np.clip(chunk, -32768, 32767).astype(np.int16)
-
+                if process_block is not None:
+                    chunk = process_block(chunk)  # 边播放边滤波，滤波器改动在一个块内生效
                 if len(chunk) == 0:
                     break
 
+                # 多声道块按行优先存储，tobytes() 即为交错的 PCM 帧
+                with perf_stats.stage("quantize", len(chunk), chunk.nbytes, sample_rate):
+                    chunk = quantize_to_int16(chunk.reshape(len(chunk), n_channels), pcm[:len(chunk)], dither)
+
+                write_start = time.perf_counter()
+                if last_write is not None and write_start - last_write > chunk_seconds:
+                    perf_stats.increment("late_writes")  # 两次写入间隔超过一个块的时长，可能断音
                 stream.write(chunk.tobytes())
+                last_write = time.perf_counter()
+                perf_stats.record("stream_write", last_write - write_start, len(chunk), chunk.nbytes, sample_rate)
             else:
                 position = 0  # 播放结束后重置位置
                 break
@@ -71,3 +201,196 @@ def play_audio(sample_rate, get_audio_data, stop_event, start_position):
         p.terminate()
 
     return position  # 返回当前播放位置
+
+class PlaybackEngine:
+    """
+    回调模式的低延迟播放引擎。
+    生产者线程提前把（滤波后的）音频量化写入预分配的环形缓冲区，声卡回调只做内存拷贝；
+    暂停/继续只启停音频流，PyAudio 设备句柄在引擎关闭前一直保留。
+    缓冲区越大越不容易断音，但滤波器改动生效的延迟也越大（约 buffer_chunks * chunk_size 个样本）。
+    """
+
+    def __init__(self, sample_rate, n_channels, get_audio_data, process_block=None,
+                 chunk_size=1024, buffer_chunks=8, on_finished=None, dither=False):
+        """
+        :param sample_rate: 采样率
+        :param n_channels: 声道数
+        :param get_audio_data: 函数，用于动态获取最新的音频数据
+        :param process_block: 可选函数，在写入缓冲区前对每个块进行滤波
+        :param chunk_size: 每次生产和回调的帧数
+        :param buffer_chunks: 环形缓冲区能容纳的块数
+        :param on_finished: 可选函数，播放到结尾或生产者出错停止时在音频线程中调用
+        :param dither: 量化为 int16 时是否加入抖动
+        """
+        self.sample_rate = sample_rate
+        self.n_channels = n_channels
+        self.get_audio_data = get_audio_data
+        self.process_block = process_block
+        self.chunk_size = chunk_size
+        self.capacity = chunk_size * buffer_chunks
+        self.on_finished = on_finished
+        self.dither = dither
+        self.underruns = 0  # 缓冲区数据不足、用静音补齐的次数
+        self.first_audio_time = None  # 最近一次 resume 后声卡第一次取到音频数据的时刻（perf_counter）
+
+        self._ring = np.zeros((self.capacity, n_channels), dtype=np.int16)
+        self._out = np.zeros((self.capacity, n_channels), dtype=np.int16)
+        self._scratch = np.zeros((chunk_size, n_channels), dtype=np.float32)  # 量化用的临时缓冲区
+        self._rng = np.random.default_rng()
+        self._read = 0  # 已被声卡取走的帧数（自 seek 起）
+        self._write = 0  # 已写入缓冲区的帧数（自 seek 起）
+        self._base_position = 0  # seek 时的起始样本索引
+        self._source_position = 0  # 下一个要生产的样本索引
+        self._source_done = False
+        self._generation = 0  # 每次 seek 递增，丢弃旧位置上生产的数据
+        self._closed = False
+        self.finished = False
+        self.error = None  # 生产者获取或滤波音频时抛出的异常，出错后播放完已缓冲的数据即停止
+        self._cond = threading.Condition()
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16,
+                                     channels=n_channels,
+                                     rate=sample_rate,
+                                     output=True,
+                                     frames_per_buffer=chunk_size,
+                                     stream_callback=self._callback,
+                                     start=False)
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._producer.start()
+
+    @property
+    def position(self):
+        """
+        当前播放位置（已交给声卡的样本索引）。
+        """
+        with self._cond:
+            return self._base_position + self._read
+
+    def seek(self, position):
+        """
+        从指定样本位置开始播放，清空缓冲区中尚未播放的数据。
+        """
+        with self._cond:
+            self._generation += 1
+            self._read = 0
+            self._write = 0
+            self._base_position = position
+            self._source_position = position
+            self._source_done = False
+            self.finished = False
+            self.error = None
+            self._cond.notify_all()
+
+    def resume(self):
+        """
+        开始或继续播放。启动前等待缓冲区预填充至少一个块，避免一开始就断音。
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._source_done or self._write - self._read >= self.chunk_size, timeout=1.0)
+        if not self._stream.is_stopped():
+            self._stream.stop_stream()  # 回调返回 paComplete 后需先停止才能重新启动
+        self.first_audio_time = None
+        self._stream.start_stream()
+
+    def pause(self):
+        """
+        暂停播放，缓冲区内容保留，继续播放时无缝衔接。
+        """
+        if not self._stream.is_stopped():
+            self._stream.stop_stream()
+
+    def close(self):
+        """
+        停止播放并释放音频设备。
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._producer.join()
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+    def _produce(self):
+        """
+        生产者线程：在缓冲区有空位时获取、滤波并量化下一个块。
+        """
+        while True:
+            with self._cond:
+                while not self._closed and (self._source_done
+                                            or self._write - self._read > self.capacity - self.chunk_size):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                position = self._source_position
+                generation = self._generation
+
+            try:
+                audio_data = self.get_audio_data()
+                chunk = audio_data[position:position + self.chunk_size]
+                if len(chunk) > 0 and self.process_block is not None:
+                    chunk = self.process_block(chunk)
+                if chunk.ndim == 1:
+                    chunk = chunk[:, None]
+            except Exception as e:
+                # 不让异常悄悄结束生产者线程：记录错误并当作音频结束，回调播完缓冲区后通知 on_finished
+                with self._cond:
+                    if generation == self._generation:
+                        self.error = e
+                        self._source_done = True
+                        self._cond.notify_all()
+                continue
+
+            with self._cond:
+                if generation != self._generation:
+                    continue  # 生产期间发生了 seek
+                n = len(chunk)
+                if n == 0:
+                    self._source_done = True
+                    continue
+                if self._write > 0 and self._write - self._read < self.chunk_size:
+                    perf_stats.increment("late_writes")  # 写入时缓冲区已不足一个块，接近断音
+                start = self._write % self.capacity
+                first = min(n, self.capacity - start)
+                # 直接量化到环形缓冲区，这是整个处理链中唯一的一次量化
+                with perf_stats.stage("quantize", n, chunk.nbytes, self.sample_rate):
+                    quantize_to_int16(chunk[:first], self._ring[start:start + first], self.dither,
+                                      self._scratch[:first], self._rng)
+                    quantize_to_int16(chunk[first:], self._ring[:n - first], self.dither,
+                                      self._scratch[first:n], self._rng)
+                self._write += n
+                self._source_position = position + n
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """
+        PortAudio 回调：从环形缓冲区拷贝 frame_count 帧，数据不足时补静音。
+        """
+        callback_start = time.perf_counter()
+        out = self._out[:frame_count]
+        with self._cond:
+            n = min(frame_count, self._write - self._read)
+            start = self._read % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._ring[start:start + first]
+            out[first:n] = self._ring[:n - first]
+            self._read += n
+            done = self._source_done and self._read == self._write
+            self._cond.notify_all()
+        if n > 0 and self.first_audio_time is None:
+            self.first_audio_time = callback_start
+
+        perf_stats.record("callback", time.perf_counter() - callback_start, n, out.nbytes, self.sample_rate)
+        if status & pyaudio.paOutputUnderflow:
+            perf_stats.increment("output_underflows")  # 声卡报告的输出欠载
+        if n < frame_count:
+            out[n:] = 0
+            if not done:
+                self.underruns += 1
+                perf_stats.increment("playback_underruns")
+        if done:
+            self.finished = True
+            if self.on_finished is not None:
+                self.on_finished()
+            return out.tobytes(), pyaudio.paComplete
+        return out.tobytes(), pyaudio.paContinue
@@ -0,0 +1,162 @@
+import os
+import sys
+import time
+import wave
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from audio_io import read_audio, quantize_to_int16
+from fir_filter import Filter
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".aac")
+
+
+def make_filter(sample_rate, family, filter_type, cutoff, order=None, multirate=False, transition_width=None,
+                passband_ripple=0.1, stopband_attenuation=60, minimum_phase=False):
+    """
+    按滤波器规格创建并设计 Filter。
+    :param sample_rate: 采样率
+    :param family: 滤波器实现 ('FIR', 'IIR', 'FFT')
+    :param filter_type: 滤波器类型 ('lowpass', 'highpass', 'bandpass', 'bandstop', 'none')
+    :param cutoff: 截止频率（Hz），单值或范围
+    :param order: 滤波器阶数，None 时使用默认值
+    :param multirate: 窄带 FIR 是否使用多速率执行
+    :param transition_width: 过渡带宽度（Hz）；给出时忽略 order，按指标设计最低阶 FIR/IIR
+    :param passband_ripple: 按指标设计时的通带纹波（dB）
+    :param stopband_attenuation: 按指标设计时的阻带衰减（dB）
+    :param minimum_phase: 按指标设计 FIR 时是否使用最小相位
+    """
+    audio_filter = Filter(sample_rate, family)
+    audio_filter.multirate = multirate
+    if transition_width is not None and family in ("FIR", "IIR") and filter_type != "none":
+        audio_filter.design_from_spec(filter_type, cutoff, transition_width, passband_ripple, stopband_attenuation,
+                                      minimum_phase=minimum_phase)
+    elif family == "FIR":
+        audio_filter.design_FIR_filter(filter_type, cutoff, order)
+    elif family == "IIR":
+        audio_filter.design_IIR_filter(filter_type, cutoff, order)
+    elif family == "FFT":
+        audio_filter.design_fft_filter(filter_type, cutoff)
+    else:
+        raise ValueError(f"Unsupported filter type: {family}")
+    return audio_filter
+
+
+def process_file(in_path, out_path, spec, block_size=65536, dither=False):
+    """
+    对单个文件滤波并分块写出 16 位 WAV。
+    :param in_path: 输入音频文件路径
+    :param out_path: 输出 WAV 文件路径
+    :param spec: 滤波器规格字典（make_filter 除采样率以外的参数）
+    :param block_size: 每次滤波和写出的样本数
+    :param dither: 量化为 int16 时是否加入抖动
+    :return: 包含耗时和样本数的统计字典
+    """
+    start = time.perf_counter()
+    sample_rate, audio_data, duration = read_audio(in_path)
+    audio_filter = make_filter(sample_rate, **spec)
+
+    # FFT 滤波器流式处理时只是近似、多速率只用于整段滤波，这两种情况整段滤波后再分块写出；
+    # 其余 FIR/IIR 逐块滤波结果与整段一致
+    if audio_filter.type == "FFT" or audio_filter.multirate:
+        filtered = audio_filter.apply_current_filter(audio_data)
+        blocks = (filtered[i:i + block_size] for i in range(0, len(filtered), block_size))
+    else:
+        blocks = (audio_filter.process_block(audio_data[i:i + block_size])
+                  for i in range(0, len(audio_data), block_size))
+
+    pcm = np.empty((block_size, audio_data.shape[1]), dtype=np.int16)  # 预分配的量化输出缓冲区
+    with wave.open(out_path, 'wb') as wf:
+        wf.setnchannels(audio_data.shape[1])
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        for block in blocks:
+            wf.writeframes(quantize_to_int16(block, pcm[:len(block)], dither).tobytes())
+
+    elapsed = time.perf_counter() - start
+    return {"file": in_path, "output": out_path, "seconds": elapsed,
+            "samples": audio_data.size, "duration": duration, "design": audio_filter.design_report}
+
+
+def collect_inputs(paths):
+    """
+    展开输入路径，目录中的音频文件按文件名排序加入。
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def output_path_for(in_path, output_dir):
+    stem = os.path.splitext(os.path.basename(in_path))[0]
+    return os.path.join(output_dir, f"{stem}_filtered.wav")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量对音频文件应用滤波器（无界面）")
+    parser.add_argument("inputs", nargs="+", help="输入音频文件或目录")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出目录")
+    parser.add_argument("--family", choices=["FIR", "IIR", "FFT"], default="FIR", help="滤波器实现")
+    parser.add_argument("--type", dest="filter_type", default="lowpass",
+                        choices=["none", "lowpass", "highpass", "bandpass", "bandstop"], help="滤波器类型")
+    parser.add_argument("--cutoff", type=float, nargs="+", default=[1000.0],
+                        help="截止频率 (Hz)，带通/带阻需给出两个值")
+    parser.add_argument("--order", type=int, default=None, help="滤波器阶数")
+    parser.add_argument("--transition-width", type=float, default=None,
+                        help="过渡带宽度 (Hz)；给出时忽略 --order，按指标自动设计最低阶 FIR/IIR")
+    parser.add_argument("--ripple", type=float, default=0.1, help="按指标设计时的通带纹波 (dB)")
+    parser.add_argument("--attenuation", type=float, default=60.0, help="按指标设计时的阻带衰减 (dB)")
+    parser.add_argument("--min-phase", action="store_true", help="按指标设计 FIR 时使用最小相位")
+    parser.add_argument("--multirate", action="store_true", help="窄带 FIR 使用多速率（抽取-滤波-内插）执行，仅在估计比全速率更快时生效")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="并行进程数")
+    parser.add_argument("--block-size", type=int, default=65536, help="分块写出的样本数")
+    parser.add_argument("--dither", action="store_true", help="量化为 16 位时加入 TPDF 抖动")
+    args = parser.parse_args(argv)
+
+    cutoff = args.cutoff[0] if len(args.cutoff) == 1 else args.cutoff
+    spec = {"family": args.family, "filter_type": args.filter_type, "cutoff": cutoff, "order": args.order,
+            "multirate": args.multirate, "transition_width": args.transition_width,
+            "passband_ripple": args.ripple, "stopband_attenuation": args.attenuation, "minimum_phase": args.min_phase}
+    files = collect_inputs(args.inputs)
+    if not files:
+        parser.error("没有找到可处理的音频文件")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results = []
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_file, path, output_path_for(path, args.output_dir), spec,
+                                   args.block_size, args.dither): path for path in files}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"失败 {futures[future]}: {e}", file=sys.stderr)
+                continue
+            results.append(result)
+            print(f"{result['file']}: {result['seconds']:.2f} 秒, "
+                  f"实时倍率 {result['duration'] / result['seconds']:.1f}x")
+            design = result["design"]
+            if design:
+                print(f"  设计: {design['method']} {design['order']} 阶, 每样本 {design['mults_per_sample']} 次乘法, "
+                      f"通带纹波 {design['passband_ripple_db']:.3f} dB, 阻带衰减 {design['stopband_attenuation_db']:.1f} dB")
+    wall = time.perf_counter() - start
+
+    total_audio = sum(r["duration"] for r in results)
+    total_samples = sum(r["samples"] for r in results)
+    print(f"完成 {len(results)} 个文件，失败 {failures} 个，总耗时 {wall:.2f} 秒")
+    if wall > 0:
+        print(f"吞吐量: {total_samples / wall / 1e6:.2f} M 样本/秒, "
+              f"{total_audio / wall:.1f} 秒音频/秒")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
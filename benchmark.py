@@ -0,0 +1,252 @@
+import os
+import sys
+import subprocess
+import json
+import time
+import wave
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+from audio_io import read_audio, quantize_to_int16
+from fir_filter import Filter, design_cache
+
+# 完整测试矩阵；--quick 时只取每个维度的第一个值
+DURATIONS = [10, 60]  # 秒
+SAMPLE_RATES = [48000, 44100]
+DTYPES = ["int16", "float32"]
+FIR_TAPS = [1024, 64, 4096]
+IIR_ORDERS = [17, 8]
+CHUNK_SIZE = 1024
+
+
+def synthetic_signal(duration, sample_rate, dtype, n_channels=2, seed=0):
+    """
+    生成可复现的测试信号（固定随机种子的白噪声加正弦）。
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration * sample_rate)
+    t = np.arange(n_samples) / sample_rate
+    signal = 8000 * np.sin(2 * np.pi * 440 * t)[:, None] + 2000 * rng.standard_normal((n_samples, n_channels))
+    return signal.astype(dtype)
+
+
+def measure(func, signal, sample_rate, repeat):
+    """
+    运行 func，取 repeat 次中最快的一次，并用 tracemalloc 记录峰值内存。
+    吞吐量按所有声道的样本总数计算，实时倍率按帧数（音频时长）计算。
+    :param signal: 被处理的信号，形状为 (帧数, 声道数)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best,
+            "samples_per_sec": signal.size / best,
+            "realtime_factor": len(signal) / sample_rate / best,
+            "peak_memory_mb": peak / 1024 ** 2}
+
+
+def make_bench_filter(sample_rate, family, order):
+    audio_filter = Filter(sample_rate, family)
+    if family == "FIR":
+        audio_filter.design_FIR_filter("bandpass", [300, 3000], order)
+    elif family == "IIR":
+        audio_filter.design_IIR_filter("bandpass", [300, 3000], order)
+    else:
+        audio_filter.design_fft_filter("bandpass", [300, 3000])
+    return audio_filter
+
+
+def filter_cases(quick):
+    """
+    生成滤波器测试用例：(名称, 采样率, 时长, 数据类型, 滤波器类型, 阶数)。
+    """
+    pick = (lambda values: values[:1]) if quick else (lambda values: values)
+    for duration in pick(DURATIONS):
+        for sample_rate in pick(SAMPLE_RATES):
+            for dtype in pick(DTYPES):
+                for taps in pick(FIR_TAPS):
+                    yield f"fir_{taps}_{sample_rate}_{duration}s_{dtype}", sample_rate, duration, dtype, "FIR", taps
+                for order in pick(IIR_ORDERS):
+                    yield f"iir_{order}_{sample_rate}_{duration}s_{dtype}", sample_rate, duration, dtype, "IIR", order
+                yield f"fft_{sample_rate}_{duration}s_{dtype}", sample_rate, duration, dtype, "FFT", None
+
+
+def bench_filters(quick, repeat):
+    results = {}
+    for name, sample_rate, duration, dtype, family, order in filter_cases(quick):
+        signal = synthetic_signal(duration, sample_rate, dtype)
+        audio_filter = make_bench_filter(sample_rate, family, order)
+        results[name] = measure(lambda: audio_filter.apply_current_filter(signal), signal, sample_rate, repeat)
+    return results
+
+
+def bench_multirate(quick, repeat):
+    """
+    窄带低通：全速率与多速率执行方式对比（直接卷积与 FFT 卷积各一组）。
+    """
+    results = {}
+    sample_rate = SAMPLE_RATES[0]
+    signal = synthetic_signal(DURATIONS[0], sample_rate, np.int16)
+    for conv_method in ("direct", "fft"):
+        for multirate in (False, True):
+            audio_filter = Filter(sample_rate, "FIR")
+            audio_filter.design_FIR_filter("lowpass", 200, FIR_TAPS[0])
+            audio_filter.conv_method = conv_method
+            audio_filter.multirate = multirate
+            name = f"fir_lowpass200_{conv_method}_{'multirate' if multirate else 'fullrate'}"
+            results[name] = measure(lambda: audio_filter.apply_current_filter(signal), signal, sample_rate, repeat)
+    return results
+
+
+def bench_parallel(quick, repeat):
+    """
+    长信号整段滤波：单线程与分段多线程对比，返回结果和各滤波器的加速比。
+    """
+    results = {}
+    speedups = {}
+    sample_rate = SAMPLE_RATES[0]
+    signal = synthetic_signal(DURATIONS[0] if quick else DURATIONS[-1], sample_rate, np.int16)
+    for family, order in (("FIR", FIR_TAPS[0]), ("IIR", IIR_ORDERS[0])):
+        audio_filter = make_bench_filter(sample_rate, family, order)
+        for workers, mode in ((1, "serial"), (None, "parallel")):
+            audio_filter.parallel_workers = workers
+            results[f"{family.lower()}_{order}_{mode}"] = measure(
+                lambda: audio_filter.apply_current_filter(signal), signal, sample_rate, repeat)
+        speedups[f"{family.lower()}_{order}"] = (results[f"{family.lower()}_{order}_serial"]["seconds"]
+                                                 / results[f"{family.lower()}_{order}_parallel"]["seconds"])
+    return results, speedups
+
+
+def bench_read_audio(quick, repeat):
+    """
+    写出临时 WAV 文件，测量 read_audio 加载并遍历全部样本的速度。
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for duration in (DURATIONS[:1] if quick else DURATIONS):
+            sample_rate = SAMPLE_RATES[0]
+            signal = synthetic_signal(duration, sample_rate, np.int16)
+            path = os.path.join(tmp_dir, f"bench_{duration}.wav")
+            with wave.open(path, 'wb') as wf:
+                wf.setnchannels(signal.shape[1])
+                wf.setsampwidth(2)
+                wf.setframerate(sample_rate)
+                wf.writeframes(signal.tobytes())
+
+            def load():
+                _, audio_data, _ = read_audio(path)
+                audio_data.sum(dtype=np.int64)  # 内存映射只有在访问时才真正读取
+
+            results[f"read_wav_{sample_rate}_{duration}s"] = measure(load, signal, sample_rate, repeat)
+    return results
+
+
+def bench_playback_chunks(quick, repeat):
+    """
+    测量播放路径上每个块的处理开销（滤波 + 量化），不打开音频设备。
+    """
+    results = {}
+    sample_rate = SAMPLE_RATES[0]
+    duration = DURATIONS[0]
+    signal = synthetic_signal(duration, sample_rate, np.int16)
+    out = np.empty((CHUNK_SIZE, signal.shape[1]), dtype=np.int16)
+    scratch = np.empty((CHUNK_SIZE, signal.shape[1]), dtype=np.float32)
+    for family, order in (("FIR", FIR_TAPS[0]), ("IIR", IIR_ORDERS[0])):
+        audio_filter = make_bench_filter(sample_rate, family, order)
+
+        def chunk_loop():
+            audio_filter.reset_state()
+            for i in range(0, len(signal), CHUNK_SIZE):
+                chunk = audio_filter.process_block(signal[i:i + CHUNK_SIZE])
+                quantize_to_int16(chunk, out[:len(chunk)], scratch=scratch[:len(chunk)])
+
+        results[f"playback_chunks_{family.lower()}_{order}"] = measure(chunk_loop, signal, sample_rate, repeat)
+    return results
+
+
+def bench_startup(repeat):
+    """
+    在新的解释器进程中测量导入耗时（冷启动），返回 {模块名: 秒}。
+    gui 应只包含界面本身，scipy.signal、matplotlib 和 pydub 改为第一次使用时才导入。
+    """
+    results = {}
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in ("gui", "fir_filter", "matplotlib.pyplot", "pydub"):
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        times = []
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True)
+            if proc.returncode != 0:
+                break  # 模块或其依赖未安装
+            times.append(float(proc.stdout.strip().splitlines()[-1]))
+        if times:
+            results[module] = min(times)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较吞吐量，返回退化超过阈值的用例列表。
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["samples_per_sec"] / baseline[name]["samples_per_sec"]
+        if ratio < 1 - threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="滤波器与音频 I/O 性能基准测试")
+    parser.add_argument("--quick", action="store_true", help="只运行最小测试矩阵")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数（取最快）")
+    parser.add_argument("--save", help="把结果保存为 JSON 基线")
+    parser.add_argument("--compare", help="与指定的 JSON 基线比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的吞吐量下降比例")
+    args = parser.parse_args(argv)
+
+    results = {}
+    results.update(bench_filters(args.quick, args.repeat))
+    results.update(bench_multirate(args.quick, args.repeat))
+    parallel_results, speedups = bench_parallel(args.quick, args.repeat)
+    results.update(parallel_results)
+    results.update(bench_read_audio(args.quick, args.repeat))
+    results.update(bench_playback_chunks(args.quick, args.repeat))
+    startup = bench_startup(args.repeat)
+
+    for name, result in results.items():
+        print(f"{name:40s} {result['samples_per_sec'] / 1e6:9.2f} M 样本/秒 "
+              f"{result['realtime_factor']:9.1f}x 实时 {result['peak_memory_mb']:8.1f} MB")
+    for name, speedup in speedups.items():
+        print(f"分段并行加速比 {name}: {speedup:.2f}x（{os.cpu_count()} 核）")
+    print(f"设计缓存: {design_cache.stats()}")
+    for module, seconds in startup.items():
+        print(f"冷启动导入 {module}: {seconds * 1000:.0f} ms")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print(f"性能退化: {name} 吞吐量为基线的 {ratio:.0%}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
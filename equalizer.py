@@ -0,0 +1,99 @@
+import numpy as np
+from fir_filter import Filter
+
+# ISO 266 倍频程（10 段）和 1/3 倍频程（31 段）中心频率
+ISO_10_BANDS = [31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
+ISO_31_BANDS = [20, 25, 31.5, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500, 630, 800,
+                1000, 1250, 1600, 2000, 2500, 3150, 4000, 5000, 6300, 8000, 10000, 12500, 16000, 20000]
+
+
+def peaking_sos(center, gain_db, q, sample_rate):
+    """
+    设计一个峰值均衡二阶节（RBJ Audio EQ Cookbook）。
+    :param center: 中心频率（Hz）
+    :param gain_db: 中心频率处的增益（dB）
+    :param q: 品质因数，越大频段越窄
+    :param sample_rate: 采样率
+    :return: 归一化的 SOS 行 [b0, b1, b2, 1, a1, a2]；增益为 0 或中心频率不低于奈奎斯特频率时为直通节
+    """
+    if gain_db == 0 or center >= sample_rate / 2:
+        return np.array([1.0, 0.0, 0.0, 1.0, 0.0, 0.0])
+    amplitude = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * center / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    b = np.array([1 + alpha * amplitude, -2 * cos_w0, 1 - alpha * amplitude])
+    a = np.array([1 + alpha / amplitude, -2 * cos_w0, 1 - alpha / amplitude])
+    return np.concatenate([b / a[0], a / a[0]])
+
+
+def graphic_q(frequencies):
+    """
+    由相邻中心频率之比得到图形均衡器各频段的 Q（倍频程为 1.41，1/3 倍频程为 4.32）。
+    """
+    ratio = np.median(np.diff(np.log2(frequencies)))
+    return np.sqrt(2 ** ratio) / (2 ** ratio - 1)
+
+
+class Equalizer(Filter):
+    """
+    图形/参数均衡器。每个频段一个峰值二阶节，所有频段堆叠为一个 SOS 矩阵，
+    一次 sosfilt 调用完成全部频段，并沿用 IIR 滤波器的整段、分段并行和流式处理路径。
+    调整某个频段只重算对应的二阶节，流式滤波状态保留，播放中调节不会从头重算。
+    """
+
+    def __init__(self, sample_rate, frequencies=ISO_10_BANDS, q=None):
+        """
+        :param sample_rate: 采样率
+        :param frequencies: 各频段中心频率（Hz），如 ISO_10_BANDS 或 ISO_31_BANDS
+        :param q: 各频段的品质因数，None 时按频段间隔取图形均衡器的默认值
+        """
+        super().__init__(sample_rate, "IIR")
+        self.filter_type = "equalizer"
+        q = graphic_q(frequencies) if q is None else q
+        self.bands = [[float(f), 0.0, float(q)] for f in frequencies]  # [中心频率, 增益 dB, Q]
+        self.filter_coeffs = np.vstack([self._band_sos(band) for band in self.bands])
+        self.iir_num_taps = 2 * len(self.bands)
+
+    def _band_sos(self, band):
+        center, gain_db, q = band
+        return peaking_sos(center, gain_db, q, self.sample_rate)
+
+    def set_band(self, index, center=None, gain_db=None, q=None):
+        """
+        修改一个频段的参数（参数均衡），只重算该频段的二阶节，不清空流式状态。
+        """
+        band = self.bands[index]
+        for i, value in enumerate((center, gain_db, q)):
+            if value is not None:
+                band[i] = float(value)
+        # 替换为新数组而不是原地修改：渲染线程中的副本仍使用旧系数
+        coeffs = self.filter_coeffs.copy()
+        coeffs[index] = self._band_sos(band)
+        self.filter_coeffs = coeffs
+
+    def set_gain(self, index, gain_db):
+        """
+        设置一个频段的增益（dB）。
+        """
+        self.set_band(index, gain_db=gain_db)
+
+    def set_gains(self, gains_db):
+        """
+        一次设置所有频段的增益（dB）。
+        """
+        if len(gains_db) != len(self.bands):
+            raise ValueError(f"Expected {len(self.bands)} gains, got {len(gains_db)}.")
+        for band, gain_db in zip(self.bands, gains_db):
+            band[1] = float(gain_db)
+        self.filter_coeffs = np.vstack([self._band_sos(band) for band in self.bands])
+
+    @property
+    def gains(self):
+        return [band[1] for band in self.bands]
+
+    def is_flat(self):
+        return all(band[1] == 0 for band in self.bands)
+
+    def _design_key(self):
+        return ("equalizer", tuple(tuple(band) for band in self.bands))
@@ -1,6 +1,154 @@
-from scipy.signal import firwin, lfilter, iirfilter, sosfilt
+from scipy.signal import firwin, lfilter, iirfilter, sosfilt, oaconvolve, freqz, sosfreqz, resample_poly
+from scipy.signal import kaiserord, remez, buttord, cheb2ord, ellipord, minimum_phase as fir_minimum_phase
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import os
+import threading
 import numpy as np
-from numpy.fft import fft, ifft, fftfreq
+from perf_stats import perf_stats
+from scipy.fft import rfft, irfft, rfftfreq, next_fast_len
+
+# 抽头数不超过该值时直接卷积更快，FFT 的固定开销不划算
+DIRECT_CONV_MAX_TAPS = 64
+# 多速率模式的最大抽取因子
+MAX_DECIMATION = 16
+# 每个全速率样本的相对开销估计（约为纳秒量级，按 scipy 实测拟合）：
+# 直接卷积 = 固定开销 + 每抽头开销，重叠相加 = 系数 * log2(抽头数) + 偏移，多相抽取加内插的往返开销基本与抽取因子无关
+DIRECT_CONV_COST = (20.0, 0.12)
+FFT_CONV_COST = (3.5, -5.0)
+RESAMPLE_COST = 42.0
+# 按指标设计 IIR 时可选的原型及其最低阶数估计函数
+IIR_ORDER_FUNCS = {"cheby2": cheb2ord, "ellip": ellipord, "butter": buttord}
+# 按指标设计 FIR 时允许的最大抽头数，以及搜索抽头数时最多尝试的设计次数
+MAX_SPEC_TAPS = 65537
+MAX_SPEC_ATTEMPTS = 32
+# IIR 分段预热长度的上限（秒），冲激响应衰减更慢的滤波器按该长度预热
+MAX_IIR_WARMUP_SECONDS = 64
+# 与设计无关、只影响执行方式的 Filter 属性：滤波器链合并阶段时沿用，各阶段必须一致
+EXECUTION_SETTINGS = ("sample_format", "conv_method", "multirate", "multirate_tolerance", "fft_stream_taps",
+                      "fft_workers", "parallel_workers", "parallel_min_segment", "iir_warmup_tolerance")
+
+
+class DesignCache:
+    """
+    滤波器系数、FFT 掩码和频率响应的 LRU 缓存。
+    按条目数和总字节数限制容量，并统计命中/未命中次数。
+    界面线程、渲染线程和播放线程共用同一个实例，查找和插入都在锁内进行。
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        查找缓存，未命中时调用 compute() 计算并保存结果。
+        返回的数组在多个 Filter 之间共享，调用方不应原地修改。
+        compute() 在锁外执行，耗时的设计不会阻塞其他线程查找缓存；
+        两个线程同时未命中同一个键时各自计算，先插入的结果保留。
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        arrays = value if isinstance(value, tuple) else (value,)
+        nbytes = sum(array.nbytes for array in arrays if isinstance(array, np.ndarray))
+        if nbytes > self.max_bytes:
+            return value  # 单个结果超过容量上限时不缓存
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+            self._entries[key] = (value, nbytes)
+            self._nbytes += nbytes
+            while len(self._entries) > self.max_entries or self._nbytes > self.max_bytes:
+                _, (_, old_nbytes) = self._entries.popitem(last=False)
+                self._nbytes -= old_nbytes
+        return value
+
+    def stats(self):
+        """
+        返回缓存的命中次数、未命中次数、条目数和占用字节数。
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._nbytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+design_cache = DesignCache()  # 所有 Filter 实例共享的设计缓存
+
+
+def _cutoff_key(cutoff):
+    """
+    将截止频率转换为可哈希的缓存键。
+    """
+    if isinstance(cutoff, (list, tuple)):
+        return tuple(float(f) for f in cutoff)
+    return None if cutoff is None else float(cutoff)
+
+
+def _along_samples(vector, ndim):
+    """
+    将一维系数/掩码变形为可沿第 0 维（样本轴）广播到 ndim 维数据的形状。
+    """
+    return np.reshape(vector, (-1,) + (1,) * (ndim - 1))
+
+
+def fir_convolve(coeffs, audio_data, method="auto"):
+    """
+    FIR 卷积，输出与 lfilter(coeffs, 1.0, audio_data, axis=0) 一致（截取前 N 个样本）。
+    :param coeffs: FIR 滤波器系数
+    :param audio_data: 输入音频数据（numpy 数组，第 0 维为样本，多声道时形状为 (样本数, 声道数)）
+    :param method: 'direct'、'fft'（重叠相加）或 'auto'（按抽头数与信号长度自动选择）
+    :return: 滤波后的音频数据
+    """
+    num_taps = len(coeffs)
+    n_samples = len(audio_data)
+    if method == "auto":
+        # 直接卷积代价约 N*M，重叠相加约 N*log2(M)，短信号或短滤波器时直接卷积更快
+        if num_taps <= DIRECT_CONV_MAX_TAPS or n_samples < 4 * num_taps:
+            method = "direct"
+        else:
+            method = "fft"
+
+    if method == "direct":
+        return lfilter(coeffs, 1.0, audio_data, axis=0)
+    elif method == "fft":
+        # oaconvolve 按重叠相加分块，并自动选用快速 FFT 长度；所有声道在一次调用中沿样本轴处理
+        return oaconvolve(audio_data, _along_samples(coeffs, audio_data.ndim), axes=0)[:n_samples]
+    else:
+        raise ValueError(f"Unsupported convolution method: {method}")
+
+
+def conv_cost(num_taps, method="auto"):
+    """
+    估计长信号上 fir_convolve 每个样本的相对开销，用于比较不同执行方式。
+    :param num_taps: FIR 抽头数
+    :param method: 与 fir_convolve 相同；'auto' 按长信号时的选择计算
+    """
+    if method == "auto":
+        method = "direct" if num_taps <= DIRECT_CONV_MAX_TAPS else "fft"
+    if method == "direct":
+        return DIRECT_CONV_COST[0] + DIRECT_CONV_COST[1] * num_taps
+    return FFT_CONV_COST[0] * np.log2(max(num_taps, 2)) + FFT_CONV_COST[1]
+
 
 class Filter:
     def __init__(self, sample_rate, type_of_filter):
@@ -11,6 +159,18 @@ class Filter:
         self.fir_num_taps = 1024
         self.iir_num_taps = 17
         self.filter_coeffs = None
+        self.sample_format = np.float32  # 内部样本格式：FIR/FFT 计算和所有输出使用该精度，IIR 内部以 float64 计算
+        self.conv_method = "auto"  # FIR 卷积方式：'auto'、'direct' 或 'fft'
+        self.multirate = False  # 窄带 FIR 是否先抽取、在低采样率下滤波再内插
+        self.multirate_tolerance = 1e-2  # 多速率结果相对全速率结果允许的均方根误差
+        self.fft_stream_taps = 2049  # 流式处理时 FFT 滤波器等效 FIR 的长度
+        self.fft_workers = -1  # FFT 并行线程数，-1 表示使用全部 CPU 核心
+        self.parallel_workers = 1  # 整段 FIR/IIR 滤波时分段并行的线程数，1 表示不分段，None 表示使用全部 CPU 核心
+        self.parallel_min_segment = 1 << 18  # 分段并行时每段的最少样本数
+        self.iir_warmup_tolerance = 1e-6  # IIR 分段时预热后段首允许的相对误差
+        self._stream_state = None  # 流式处理的滤波器状态（zi 或块间重叠尾部）
+        self.design_spec = None  # 按指标设计时的指标参数，手动指定阶数时为 None
+        self.design_report = None  # 按指标设计的结果报告（阶数、每样本运算量等）
 
     def design_FIR_filter(self, filter_type, cutoff, num_taps):
         """
@@ -20,6 +180,9 @@ class Filter:
         """
         self.filter_type = filter_type
         self.cutoff = cutoff
+        self.reset_state()
+        self.design_spec = None
+        self.design_report = None
 
         if filter_type == "none":
             self.filter_coeffs = None
@@ -53,7 +216,10 @@ class Filter:
             if normalized_cutoff <= 0 or normalized_cutoff >= 1:
                 raise ValueError("Normalized cutoff frequency must be between 0 and 1.")
 
-        self.filter_coeffs = firwin(self.fir_num_taps+1, normalized_cutoff, pass_zero=pass_zero_self)
+        key = ("FIR", filter_type, _cutoff_key(cutoff), self.fir_num_taps, self.sample_rate)
+        with perf_stats.stage("design"):
+            self.filter_coeffs = design_cache.get_or_compute(
+                key, lambda: firwin(self.fir_num_taps+1, normalized_cutoff, pass_zero=pass_zero_self))
 
     def apply_fir_filter(self, audio_data):
         """
@@ -63,7 +229,154 @@ class Filter:
         """
         if self.filter_coeffs is None:
             return audio_data
-        return lfilter(self.filter_coeffs, 1.0, audio_data)
+        plan = self._multirate_plan()
+        if plan is not None:
+            return self._apply_multirate(audio_data, plan)
+        coeffs = self._coeffs(self.filter_coeffs)
+        # 每段向前重叠 M-1 个样本（滤波器长度），分段结果与整段滤波完全一致
+        filtered = self._apply_segmented(audio_data, len(coeffs) - 1,
+                                         lambda segment: fir_convolve(coeffs, self._as_samples(segment), self.conv_method))
+        if filtered is not None:
+            return filtered
+        return fir_convolve(coeffs, self._as_samples(audio_data), self.conv_method)
+
+    """
+    长信号分段并行滤波
+
+    """
+
+    def _apply_segmented(self, audio_data, overlap, filter_segment):
+        """
+        把长信号分段，在线程池中并行滤波（scipy 的滤波和 FFT 在计算时释放 GIL），结果写入同一个输出数组。
+        每段向前多取 overlap 个样本作为预热，滤波后丢弃这部分输出。
+        每段至少为预热长度的 4 倍，预热带来的额外计算不超过 25%。
+        :param overlap: 每段的预热样本数，或返回预热样本数的函数（计算代价较高时，只在确实分段时才调用）
+        :param filter_segment: 对一段（含预热部分）滤波的函数
+        :return: 滤波后的音频数据；不并行或信号太短不值得分段时返回 None
+        """
+        workers = self.parallel_workers or os.cpu_count() or 1
+        n_samples = len(audio_data)
+        if workers <= 1 or n_samples <= self.parallel_min_segment:
+            return None
+        if callable(overlap):
+            overlap = overlap()
+        segment = max(self.parallel_min_segment, 4 * overlap, -(-n_samples // workers))
+        if n_samples <= segment:
+            return None
+
+        output = np.empty(audio_data.shape, dtype=self.sample_format)
+
+        def run(start):
+            end = min(start + segment, n_samples)
+            warm_start = max(0, start - overlap)
+            output[start:end] = filter_segment(audio_data[warm_start:end])[start - warm_start:]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run, range(0, n_samples, segment)))
+        return output
+
+    def _iir_warmup(self):
+        """
+        IIR 分段滤波的预热长度：从该点往后的冲激响应尾部能量不超过总能量的 iir_warmup_tolerance²，
+        即段首从零状态开始、预热这么多样本后，相对误差不超过 iir_warmup_tolerance。
+        """
+        def compute():
+            threshold = self.iir_warmup_tolerance ** 2
+            length = self.sample_rate
+            while True:
+                impulse = np.zeros(length)
+                impulse[0] = 1
+                energy = sosfilt(self.filter_coeffs, impulse) ** 2
+                tail = np.cumsum(energy[::-1])[::-1]  # tail[n] 为第 n 个样本之后的能量
+                # 后半段能量已可忽略时，截断在 length 处的误差也可忽略，结果可信
+                if tail[length // 2] <= threshold * tail[0]:
+                    return int(np.argmax(tail <= threshold * tail[0]))
+                if length >= MAX_IIR_WARMUP_SECONDS * self.sample_rate:
+                    return length
+                length *= 2
+
+        key = ("IIR warmup",) + self._design_key() + (self.iir_num_taps, self.sample_rate, self.iir_warmup_tolerance)
+        return design_cache.get_or_compute(key, compute)
+
+    """
+    多速率（多相）FIR 滤波
+
+    """
+
+    def _multirate_plan(self):
+        """
+        返回多速率执行方案 (抽取因子, 低速率 FIR 系数, 延迟补偿)，不适用时返回 None。
+        """
+        if not self.multirate or self.filter_type not in ("lowpass", "bandpass"):
+            return None
+        key = ("multirate",) + self._design_key() + (self.fir_num_taps, self.sample_rate, self.multirate_tolerance,
+                                                     self.conv_method)
+        return design_cache.get_or_compute(key, self._design_multirate)
+
+    def _design_multirate(self):
+        """
+        选择抽取因子并在低采样率下设计较短的 FIR。
+        通带上沿需低于抽取后奈奎斯特频率的 80%，为多相抗混叠滤波器留出过渡带。
+        估计开销不低于全速率执行（例如全速率已使用重叠相加卷积）时不使用多速率；
+        设计完成后用白噪声探测信号与全速率结果比较，误差超出容限时也放弃多速率。
+        """
+        top = max(self.cutoff) if isinstance(self.cutoff, (list, tuple)) else self.cutoff
+        factor = 1
+        while factor * 2 <= MAX_DECIMATION and top < 0.8 * self.sample_rate / (4 * factor):
+            factor *= 2
+        # 保持与全速率滤波器相同的群延迟：低速率阶数取偶数，剩余的整数延迟在输出端补偿
+        order = self.fir_num_taps // factor
+        order -= order % 2
+        if factor == 1 or order < 2 or self.fir_num_taps % 2:
+            return None
+        full_cost = conv_cost(self.fir_num_taps + 1, self.conv_method)
+        if RESAMPLE_COST + conv_cost(order + 1, self.conv_method) / factor >= full_cost:
+            return None
+
+        low_nyquist = self.sample_rate / factor / 2
+        if isinstance(self.cutoff, (list, tuple)):
+            normalized_cutoff = [f / low_nyquist for f in self.cutoff]
+        else:
+            normalized_cutoff = self.cutoff / low_nyquist
+        coeffs = firwin(order + 1, normalized_cutoff, pass_zero=self.filter_type == "lowpass")
+        plan = (factor, coeffs, self.fir_num_taps // 2 - order * factor // 2)
+
+        probe = np.random.default_rng(0).standard_normal(max(8 * self.fir_num_taps, 8192))
+        if self._multirate_error(probe, plan) > self.multirate_tolerance:
+            return None
+        return plan
+
+    def _apply_multirate(self, audio_data, plan):
+        """
+        多相抽取 -> 低速率 FIR -> 多相内插，并补偿与全速率滤波器的延迟差。
+        """
+        factor, coeffs, delay = plan
+        audio_data = self._as_samples(audio_data)
+        n_samples = len(audio_data)
+        low_rate = resample_poly(audio_data, 1, factor, axis=0)
+        low_rate = fir_convolve(self._coeffs(coeffs), self._as_samples(low_rate), self.conv_method)
+        filtered = resample_poly(low_rate, factor, 1, axis=0)[:n_samples]
+        if delay:
+            filtered = np.concatenate([np.zeros((delay,) + filtered.shape[1:]), filtered[:n_samples - delay]])
+        return filtered.astype(self.sample_format, copy=False)
+
+    def _multirate_error(self, audio_data, plan):
+        full = fir_convolve(self.filter_coeffs, np.asarray(audio_data, dtype=np.float64))
+        fast = self._apply_multirate(audio_data, plan)
+        return np.sqrt(np.mean((fast - full) ** 2) / max(np.mean(full ** 2), 1e-30))
+
+    def verify_multirate(self, audio_data):
+        """
+        在给定音频上比较多速率结果与全速率结果。
+        :param audio_data: 输入音频数据（numpy 数组）
+        :return: 相对均方根误差；当前设计不使用多速率时返回 None
+        """
+        if self.type != "FIR" or self.filter_coeffs is None:
+            return None
+        plan = self._multirate_plan()
+        if plan is None:
+            return None
+        return self._multirate_error(audio_data, plan)
     
     """
     IIR 滤波器设计
@@ -78,6 +391,9 @@ class Filter:
         """
         self.filter_type = filter_type
         self.cutoff = cutoff
+        self.reset_state()
+        self.design_spec = None
+        self.design_report = None
 
         if filter_type == "none":
             self.filter_coeffs = None
@@ -100,7 +416,10 @@ class Filter:
                 raise ValueError("Normalized cutoff frequency must be between 0 and 1.")
         pass
 
-        self.filter_coeffs = iirfilter(self.iir_num_taps, cutoff ,rs=100, btype=filter_type, ftype='cheby2', output='sos',  fs=self.sample_rate)
+        key = ("IIR", filter_type, _cutoff_key(cutoff), self.iir_num_taps, self.sample_rate)
+        with perf_stats.stage("design"):
+            self.filter_coeffs = design_cache.get_or_compute(
+                key, lambda: iirfilter(self.iir_num_taps, cutoff ,rs=100, btype=filter_type, ftype='cheby2', output='sos',  fs=self.sample_rate))
 
     def apply_iir_filter(self, audio_data):
         """
@@ -111,11 +430,260 @@ class Filter:
         """
         if self.filter_coeffs is None:
             return audio_data
-        return sosfilt(self.filter_coeffs, audio_data)
-    
+        # 递归结构会累积系数和状态的舍入误差（低截止频率时极点紧贴单位圆），
+        # 因此 IIR 的系数和状态保持 float64，只有输入输出使用内部样本格式
+        filtered = self._apply_segmented(
+            audio_data, self._iir_warmup,
+            lambda segment: sosfilt(self.filter_coeffs, self._as_samples(segment), axis=0))
+        if filtered is not None:
+            return filtered
+        filtered = sosfilt(self.filter_coeffs, self._as_samples(audio_data), axis=0)
+        return filtered.astype(self.sample_format, copy=False)
+
+    """
+    按指标自动设计最低阶滤波器
+
+    """
+
+    def design_from_spec(self, filter_type, cutoff, transition_width, passband_ripple=0.1,
+                         stopband_attenuation=60, method=None, minimum_phase=False):
+        """
+        按指标设计满足要求的最低阶滤波器（FIR 或 IIR，取决于当前滤波器实现）。
+        :param filter_type: 滤波器类型 ('lowpass', 'highpass', 'bandpass', 'bandstop')
+        :param cutoff: 截止频率（Hz），单值或范围，即过渡带的中心
+        :param transition_width: 过渡带宽度（Hz）
+        :param passband_ripple: 通带最大纹波（dB，峰峰值）
+        :param stopband_attenuation: 阻带最小衰减（dB）
+        :param method: FIR 为 'kaiser' 或 'remez'，IIR 为 'cheby2'、'ellip' 或 'butter'；
+                       None 时尝试所有方法，选用每样本乘法次数最少的设计
+        :param minimum_phase: FIR 是否转换为最小相位（延迟更小，但不再是线性相位；
+                              原型需按加倍的 dB 指标设计，抽头数与线性相位设计相近，并不会更少）
+        :return: 设计报告字典（方法、阶数、每样本乘法次数、实测通带纹波与阻带衰减）
+        """
+        if self.type == "FIR":
+            methods = ("kaiser", "remez")
+        elif self.type == "IIR":
+            methods = tuple(IIR_ORDER_FUNCS)
+        else:
+            raise ValueError(f"Spec-driven design is not supported for filter type: {self.type}")
+        if method is not None and method not in methods:
+            raise ValueError(f"Unsupported design method for {self.type} filter: {method}")
+        passband, stopband = self._spec_edges(filter_type, cutoff, transition_width)
+        regions = self._spec_regions(filter_type, passband, stopband)
+
+        def compute():
+            candidates = []
+            for candidate in ([method] if method else methods):
+                try:
+                    if self.type == "FIR":
+                        candidates.append(self._design_spec_fir(candidate, filter_type, cutoff, transition_width,
+                                                                regions, passband_ripple, stopband_attenuation,
+                                                                minimum_phase))
+                    else:
+                        candidates.append(self._design_spec_iir(candidate, filter_type, passband, stopband,
+                                                                regions, passband_ripple, stopband_attenuation))
+                except ValueError:
+                    if method:
+                        raise
+            if not candidates:
+                raise ValueError("The filter specification cannot be met by any design method.")
+            return min(candidates, key=lambda candidate: candidate[1]["mults_per_sample"])
+
+        spec = (float(transition_width), float(passband_ripple), float(stopband_attenuation), method,
+                bool(minimum_phase))
+        key = ("spec", self.type, filter_type, _cutoff_key(cutoff)) + spec + (self.sample_rate,)
+        with perf_stats.stage("design"):
+            coeffs, report = design_cache.get_or_compute(key, compute)
+
+        self.filter_type = filter_type
+        self.cutoff = cutoff
+        self.reset_state()
+        self.filter_coeffs = coeffs
+        self.design_spec = spec
+        self.design_report = report
+        if self.type == "FIR":
+            self.fir_num_taps = report["order"]
+        else:
+            self.iir_num_taps = report["order"]
+        return dict(report)
+
+    def _spec_edges(self, filter_type, cutoff, transition_width):
+        """
+        由截止频率和过渡带宽度得到通带边缘和阻带边缘（Hz），过渡带以截止频率为中心。
+        """
+        if transition_width <= 0:
+            raise ValueError("Transition width must be positive.")
+        half = transition_width / 2
+        if filter_type in ("lowpass", "highpass"):
+            if isinstance(cutoff, (list, tuple)):
+                raise ValueError(f"A {filter_type} filter needs a single cutoff frequency.")
+            sign = 1 if filter_type == "lowpass" else -1
+            passband, stopband = cutoff - sign * half, cutoff + sign * half
+            edges = [passband, stopband]
+        elif filter_type in ("bandpass", "bandstop"):
+            if not isinstance(cutoff, (list, tuple)) or len(cutoff) != 2:
+                raise ValueError(f"A {filter_type} filter needs two cutoff frequencies.")
+            low, high = sorted(cutoff)
+            inner, outer = [low + half, high - half], [low - half, high + half]
+            passband, stopband = (inner, outer) if filter_type == "bandpass" else (outer, inner)
+            if inner[0] >= inner[1]:
+                raise ValueError("Transition width is too wide for the given band.")
+            edges = inner + outer
+        else:
+            raise ValueError(f"Unsupported filter type: {filter_type}")
+
+        if any(f <= 0 or f >= self.sample_rate / 2 for f in edges):
+            raise ValueError("Transition bands must lie between 0 Hz and the Nyquist frequency.")
+        return passband, stopband
+
+    def _spec_regions(self, filter_type, passband, stopband):
+        """
+        返回按频率升序排列的通带/阻带区间 [(起始频率, 结束频率, 期望增益)]，不含过渡带。
+        """
+        nyquist = self.sample_rate / 2
+        if filter_type == "lowpass":
+            return [(0, passband, 1), (stopband, nyquist, 0)]
+        elif filter_type == "highpass":
+            return [(0, stopband, 0), (passband, nyquist, 1)]
+        elif filter_type == "bandpass":
+            return [(0, stopband[0], 0), (passband[0], passband[1], 1), (stopband[1], nyquist, 0)]
+        return [(0, passband[0], 1), (stopband[0], stopband[1], 0), (passband[1], nyquist, 1)]
+
+    def _design_spec_fir(self, method, filter_type, cutoff, transition_width, regions, passband_ripple,
+                         stopband_attenuation, minimum_phase):
+        """
+        估计抽头数后设计 FIR，并搜索实测满足指标的最少抽头数。
+        :return: (系数, 设计报告)
+        """
+        ripple, attenuation = passband_ripple, stopband_attenuation
+        if minimum_phase:
+            # 同态法得到的最小相位滤波器幅度约为原型幅度的平方根，原型按加倍的 dB 指标设计
+            ripple, attenuation = 2 * ripple, 2 * attenuation
+        delta_p = (10 ** (ripple / 20) - 1) / (10 ** (ripple / 20) + 1)
+        delta_s = 10 ** (-attenuation / 20)
+
+        if method == "kaiser":
+            # 窗函数法的通带与阻带纹波相同，按两者中较严格的一个确定窗参数
+            numtaps, beta = kaiserord(-20 * np.log10(min(delta_p, delta_s)), transition_width / (self.sample_rate / 2))
+            pass_zero = filter_type in ("lowpass", "bandstop")
+
+            def design(n):
+                return firwin(n, cutoff, window=("kaiser", beta), pass_zero=pass_zero, fs=self.sample_rate)
+        else:
+            # 等纹波滤波器长度的 Kaiser 经验公式
+            numtaps = int(np.ceil((-20 * np.log10(np.sqrt(delta_p * delta_s)) - 13)
+                                  / (14.6 * transition_width / self.sample_rate))) + 1
+            bands = [f for low, high, _ in regions for f in (low, high)]
+            desired = [gain for _, _, gain in regions]
+            weight = [1 if gain else delta_p / delta_s for _, _, gain in regions]
+
+            def design(n):
+                return remez(n, bands, desired, weight=weight, fs=self.sample_rate)
+
+        if minimum_phase:
+            linear_design = design
+
+            def design(n):
+                return fir_minimum_phase(linear_design(n), method="homomorphic")
+
+        def meets(coeffs):
+            measured_ripple, measured_attenuation = self._spec_response(coeffs, regions)
+            return measured_ripple <= passband_ripple and measured_attenuation >= stopband_attenuation
+
+        coeffs = self._minimum_taps(design, numtaps, meets)
+        return coeffs, self._spec_report(method, coeffs, regions, len(coeffs) - 1)
+
+    def _design_spec_iir(self, method, filter_type, passband, stopband, regions, passband_ripple,
+                         stopband_attenuation):
+        """
+        用对应原型的阶数估计函数求最低阶数并设计 IIR。
+        :return: (SOS 系数, 设计报告)
+        """
+        order, natural = IIR_ORDER_FUNCS[method](passband, stopband, passband_ripple, stopband_attenuation,
+                                                 fs=self.sample_rate)
+        sos = iirfilter(order, natural, rp=passband_ripple, rs=stopband_attenuation, btype=filter_type,
+                        ftype=method, output='sos', fs=self.sample_rate)
+        return sos, self._spec_report(method, sos, regions, order)
+
+    @staticmethod
+    def _minimum_taps(design, numtaps, meets):
+        """
+        从估计的抽头数出发搜索满足指标的最少抽头数（保持奇数，即 I 型线性相位原型）。
+        估计偏小时按 25% 的步长增大，找到满足指标的长度后在两者之间二分查找，区间缩小到约 1% 时停止。
+        总设计次数不超过 MAX_SPEC_ATTEMPTS；增大过程中设计本身失败（如 remez 不收敛）时立即放弃。
+        """
+        attempts = 0
+
+        def attempt(n, strict):
+            nonlocal attempts
+            attempts += 1
+            try:
+                coeffs = design(n)
+            except ValueError:
+                if strict:
+                    raise ValueError("The filter specification needs too many taps.")
+                return None
+            return coeffs if meets(coeffs) else None
+
+        def odd(n):
+            return max(n + 1 - n % 2, 3)
+
+        upper = odd(numtaps)
+        lower = 1  # 已知不满足指标的最大抽头数
+        coeffs = attempt(upper, strict=True)
+        while coeffs is None:
+            lower, upper = upper, odd(int(upper * 1.25))
+            if upper > MAX_SPEC_TAPS or attempts >= MAX_SPEC_ATTEMPTS:
+                raise ValueError("The filter specification needs too many taps.")
+            coeffs = attempt(upper, strict=True)
+
+        while upper - lower > max(2, upper // 100) and attempts < MAX_SPEC_ATTEMPTS:
+            middle = odd((lower + upper) // 2)
+            if middle >= upper:
+                middle = upper - 2
+            smaller = attempt(middle, strict=False)
+            if smaller is None:
+                lower = middle
+            else:
+                coeffs, upper = smaller, middle
+        return coeffs
+
+    def _spec_response(self, coeffs, regions):
+        """
+        实测设计的通带纹波（dB，峰峰值）和阻带衰减（dB）。
+        """
+        if coeffs.ndim == 2:
+            w, h = sosfreqz(coeffs, 8192, fs=self.sample_rate)
+        else:
+            w, h = freqz(coeffs, worN=max(8192, 8 * len(coeffs)), fs=self.sample_rate)
+        magnitude = 20 * np.log10(np.maximum(np.abs(h), 1e-12))
+        passband = np.zeros(len(w), dtype=bool)
+        stopband = np.zeros(len(w), dtype=bool)
+        for low, high, gain in regions:
+            (passband if gain else stopband)[(w >= low) & (w <= high)] = True
+        return magnitude[passband].max() - magnitude[passband].min(), -magnitude[stopband].max()
+
+    def _spec_report(self, method, coeffs, regions, order):
+        """
+        生成设计报告。每样本乘法次数按直接型计算（每个声道）：
+        FIR 为抽头数，IIR 每个二阶节 5 次（b0、b1、b2、a1、a2）。
+        """
+        measured_ripple, measured_attenuation = self._spec_response(coeffs, regions)
+        report = {"method": method, "order": order}
+        if coeffs.ndim == 2:
+            report.update(sections=len(coeffs), mults_per_sample=5 * len(coeffs))
+        else:
+            report.update(num_taps=len(coeffs), mults_per_sample=len(coeffs),
+                          engine="direct" if len(coeffs) <= DIRECT_CONV_MAX_TAPS else "fft")
+        report.update(passband_ripple_db=float(measured_ripple), stopband_attenuation_db=float(measured_attenuation))
+        return report
+
     def design_fft_filter(self, filter_type, cutoff):
         self.cutoff = cutoff
         self.filter_type = filter_type
+        self.reset_state()
+        self.design_spec = None
+        self.design_report = None
 
 
     def apply_fft_filter(self, audio_data):
@@ -143,29 +711,77 @@ class Filter:
                 raise ValueError("Normalized cutoff freq uency must be between 0 and 1.")
         pass
 
+        if not self._has_fft_mask():
+            return audio_data
+        return self._apply_fft_mask(audio_data)
+
+    def _apply_fft_mask(self, audio_data):
+        """
+        用 _fft_mask 给出的频域掩码对音频进行实数 FFT 滤波。
+        """
+        # 实数输入只需计算一半频谱；补零到快速 FFT 长度，避免素数长度走慢速路径
         N = len(audio_data)
-        freq = fftfreq(N, 1/self.sample_rate)
-        audio_fft = fft(audio_data)
+        n_fft = next_fast_len(N, real=True)
+        key = ("FFT mask",) + self._design_key() + (n_fft, self.sample_rate)
+        mask = design_cache.get_or_compute(key, lambda: self._fft_mask(rfftfreq(n_fft, 1/self.sample_rate)))
+
+        audio_fft = rfft(self._as_samples(audio_data), n_fft, axis=0, workers=self.fft_workers)
+        audio_fft *= _along_samples(mask, audio_fft.ndim)
+        return irfft(audio_fft, n_fft, axis=0, workers=self.fft_workers)[:N]
 
+    def _as_samples(self, audio_data):
+        """
+        把输入（如 int16）转换为内部样本格式，已是该格式时不复制。
+        """
+        return np.asarray(audio_data, dtype=self.sample_format)
+
+    def _coeffs(self, coeffs):
+        """
+        FIR 系数转换为内部样本格式，使 scipy 以同一精度计算，不把数据提升为 float64。
+        """
+        return coeffs.astype(self.sample_format, copy=False)
+
+    def _design_key(self):
+        """
+        标识当前设计的可哈希键，用于设计缓存。
+        """
+        return (self.filter_type, _cutoff_key(self.cutoff), self.design_spec)
+
+    def _has_fft_mask(self):
+        return self.cutoff is not None and self.filter_type in ("lowpass", "highpass", "bandpass", "bandstop")
+
+    def _fft_mask(self, freq):
+        """
+        根据滤波器类型和截止频率生成频域掩码。
+        :param freq: 各 FFT 频点对应的频率（Hz）
+        """
         if self.filter_type == "lowpass":
-            mask = np.abs(freq) <= self.cutoff
-                 
+            return np.abs(freq) <= self.cutoff
         elif self.filter_type == "highpass":
-            mask = np.abs(freq) >= self.cutoff
-     
+            return np.abs(freq) >= self.cutoff
         elif self.filter_type == "bandpass":
-            mask = (np.abs(freq) >= min(self.cutoff)) & (np.abs(freq) <= max(self.cutoff))
-       
+            return (np.abs(freq) >= min(self.cutoff)) & (np.abs(freq) <= max(self.cutoff))
         elif self.filter_type == "bandstop":
-            mask = (np.abs(freq) >= max(self.cutoff)) | (np.abs(freq) <= min(self.cutoff))
-        
+            return (np.abs(freq) >= max(self.cutoff)) | (np.abs(freq) <= min(self.cutoff))
         else:
-            return audio_data
-        
-        audio_fft_filtered = audio_fft * mask
-        return np.real(ifft(audio_fft_filtered))
+            raise ValueError(f"Unsupported filter type: {self.filter_type}")
+
+    def frequency_response(self, worN=20000):
+        """
+        计算当前滤波器的频率响应，结果按设计参数缓存。
+        :param worN: 频点数
+        :return: (频率 w（Hz）, 复数响应 h)
+        """
+        if self.filter_coeffs is None:
+            raise ValueError("No filter has been designed.")
+        if self.type == "FIR":
+            key = ("FIR response",) + self._design_key() + (self.fir_num_taps, self.sample_rate, worN)
+            return design_cache.get_or_compute(
+                key, lambda: freqz(self.filter_coeffs, worN=worN, fs=self.sample_rate))
+        key = ("IIR response",) + self._design_key() + (self.iir_num_taps, self.sample_rate, worN)
+        return design_cache.get_or_compute(
+            key, lambda: sosfreqz(self.filter_coeffs, worN, fs=self.sample_rate))
 
-    
     def apply_current_filter(self, audio_data):
         """
         应用滤波器设置
@@ -178,12 +794,238 @@ class Filter:
         
         # 根据使用的滤波器类型应用相应的滤波器
 
+        with perf_stats.stage("filter", len(audio_data), audio_data.nbytes, self.sample_rate):
+            if self.type == "FIR":
+                return self.apply_fir_filter(audio_data)
+            elif self.type == "IIR":
+                return self.apply_iir_filter(audio_data)
+            elif self.type == "FFT":
+                return self.apply_fft_filter(audio_data)
+            else:
+                raise ValueError(f"Unsupported filter type: {self.type}")
+        
+
+    """
+    流式（分块）滤波
+
+    """
+
+    def reset_state(self):
+        """
+        清空流式处理的滤波器状态，下一个块将从静音状态开始滤波。
+        """
+        self._stream_state = None
+
+    def process_block(self, block):
+        """
+        对一个音频块进行滤波，并在多次调用之间保持滤波器状态。
+        逐块调用的拼接结果与对整段信号调用 apply_current_filter 一致（FFT 滤波器除外，
+        流式时使用由频域掩码得到的等效 FIR 近似）。
+        :param block: 输入音频块（numpy 数组）
+        :return: 滤波后的音频块
+        """
+        if self._stream_state is None or self._stream_state["type"] != self.type:
+            self._stream_state = {"type": self.type, "zi": None, "tail": None, "kernel": None}
+        state = self._stream_state
+        if len(block) == 0:
+            return block
+        block = self._as_samples(block)
+
+        with perf_stats.stage("filter_block", len(block), block.nbytes, self.sample_rate):
+            return self._process_block(block, state)
+
+    def _process_block(self, block, state):
         if self.type == "FIR":
-            return self.apply_fir_filter(audio_data)
+            if self.filter_coeffs is None:
+                return block
+            return self._process_fir_block(self.filter_coeffs, block, state)
         elif self.type == "IIR":
-            return self.apply_iir_filter(audio_data)
+            if self.filter_coeffs is None:
+                return block
+            if state["zi"] is None:
+                state["zi"] = np.zeros((self.filter_coeffs.shape[0], 2) + block.shape[1:])  # float64，见 apply_iir_filter
+            filtered, state["zi"] = sosfilt(self.filter_coeffs, block, axis=0, zi=state["zi"])
+            return filtered.astype(self.sample_format, copy=False)
         elif self.type == "FFT":
-            return self.apply_fft_filter(audio_data)
+            if state["kernel"] is None:
+                state["kernel"] = self._fft_stream_kernel()
+            if state["kernel"] is None:
+                return block
+            return self._process_fir_block(state["kernel"], block, state)
         else:
             raise ValueError(f"Unsupported filter type: {self.type}")
-        
+
+    def _process_fir_block(self, coeffs, block, state):
+        """
+        FIR 分块卷积：短滤波器用带 zi 的 lfilter，长滤波器用 FFT 卷积并在块间重叠相加。
+        """
+        coeffs = self._coeffs(coeffs)
+        if self.conv_method == "direct" or (self.conv_method == "auto" and len(coeffs) <= DIRECT_CONV_MAX_TAPS):
+            if state["zi"] is None:
+                state["zi"] = np.zeros((len(coeffs) - 1,) + block.shape[1:], dtype=self.sample_format)
+            filtered, state["zi"] = lfilter(coeffs, 1.0, block, axis=0, zi=state["zi"])
+            return filtered
+
+        n_samples = len(block)
+        # 完整卷积长度为 N+M-1，前 M-1 个样本需要叠加上一块留下的尾部
+        full = oaconvolve(block, _along_samples(coeffs, block.ndim), axes=0)
+        if state["tail"] is not None:
+            full[:len(state["tail"])] += state["tail"]
+        state["tail"] = full[n_samples:]
+        return full[:n_samples]
+
+    def _fft_stream_kernel(self):
+        """
+        由频域掩码（频率采样法）得到 FFT 滤波器的线性相位等效 FIR，用于流式处理。
+        """
+        if not self._has_fft_mask():
+            return None
+
+        num_taps = self.fft_stream_taps
+
+        def compute():
+            mask = self._fft_mask(rfftfreq(num_taps, 1 / self.sample_rate))
+            kernel = np.roll(irfft(mask.astype(float), num_taps), num_taps // 2)
+            return kernel * np.hanning(num_taps)
+
+        key = ("FFT stream kernel",) + self._design_key() + (num_taps, self.sample_rate)
+        return design_cache.get_or_compute(key, compute)
+
+
+class _FusedFilter(Filter):
+    """
+    FilterChain 内部使用：由多个同类阶段合并得到的单个滤波器。
+    FIR 阶段的系数卷积为一个核，IIR 阶段的二阶节堆叠为一个 SOS 矩阵，FFT 阶段的掩码相乘为一个掩码。
+    执行方式（EXECUTION_SETTINGS）沿用各阶段的设置，各阶段不一致时无法合并。
+    合并后的 FIR 不再是单一的低通/带通，不使用多速率执行。
+    """
+
+    def __init__(self, sample_rate, type_of_filter, stages):
+        super().__init__(sample_rate, type_of_filter)
+        self.stages = stages
+        self.filter_type = "chain"
+        for name in EXECUTION_SETTINGS:
+            values = [getattr(stage, name) for stage in stages]
+            if any(value != values[0] for value in values[1:]):
+                raise ValueError(f"Cannot fuse {type_of_filter} stages with different {name} settings: {values}.")
+            setattr(self, name, values[0])
+        if type_of_filter == "FIR":
+            coeffs = stages[0].filter_coeffs
+            for stage in stages[1:]:
+                coeffs = np.convolve(coeffs, stage.filter_coeffs)
+            self.filter_coeffs = coeffs
+            self.fir_num_taps = len(coeffs) - 1
+        elif type_of_filter == "IIR":
+            self.filter_coeffs = np.vstack([stage.filter_coeffs for stage in stages])
+            self.iir_num_taps = len(self.filter_coeffs)
+
+    def _design_key(self):
+        return ("chain",) + tuple((stage.type,) + stage._design_key() + (stage.fir_num_taps, stage.iir_num_taps)
+                                  for stage in self.stages)
+
+    def _has_fft_mask(self):
+        return True
+
+    def _fft_mask(self, freq):
+        mask = self.stages[0]._fft_mask(freq)
+        for stage in self.stages[1:]:
+            mask = mask & stage._fft_mask(freq)
+        return mask
+
+    def apply_fft_filter(self, audio_data):
+        return self._apply_fft_mask(audio_data)
+
+
+class FilterChain:
+    """
+    由多个 Filter 级联组成的滤波器链。
+    各阶段都是线性时不变系统，顺序可以交换，因此应用前把同类阶段合并：
+    所有 FIR 合并为一个卷积核，所有 IIR 合并为一个 SOS 矩阵，所有 FFT 合并为一个频域掩码。
+    合并后每类滤波器只需遍历一次信号。
+    合并结果会被缓存，任何阶段重新设计后在下一次 apply/process_block 时重新合并
+    （与重新设计单个 Filter 一样，链的流式状态随之清空）。
+    """
+
+    def __init__(self, sample_rate, stages=()):
+        self.sample_rate = sample_rate
+        self.stages = []
+        self._fused = None
+        self._fused_designs = None  # 合并时各阶段的设计标识
+        for stage in stages:
+            self.add(stage)
+
+    def add(self, stage):
+        """
+        在链尾添加一个已设计好的 Filter 阶段。
+        """
+        if stage.sample_rate != self.sample_rate:
+            raise ValueError("All stages in a filter chain must share the same sample rate.")
+        self.stages.append(stage)
+        self._fused = None
+        return self
+
+    def fuse(self):
+        """
+        合并同类阶段，返回合并后的滤波器列表（按各类别首次出现的顺序）。
+        未设计或类型为 'none' 的阶段被跳过。
+        """
+        designs = self._stage_designs()
+        if self._fused is not None and self._same_designs(designs, self._fused_designs):
+            return self._fused
+        self._fused_designs = designs
+
+        groups = {}
+        for stage in self.stages:
+            if stage.type == "FFT":
+                active = stage._has_fft_mask()
+            else:
+                active = stage.filter_coeffs is not None
+            if active:
+                groups.setdefault(stage.type, []).append(stage)
+
+        self._fused = []
+        for type_of_filter, stages in groups.items():
+            if len(stages) == 1:
+                fused = copy.copy(stages[0])  # 复制一份，使链的流式状态与原阶段相互独立
+                fused.reset_state()
+            else:
+                fused = _FusedFilter(self.sample_rate, type_of_filter, stages)
+            self._fused.append(fused)
+        return self._fused
+
+    def _stage_designs(self):
+        """
+        各阶段当前设计的标识：设计参数、执行方式和系数数组本身。
+        """
+        return [((stage.type, stage._design_key(), stage.fir_num_taps, stage.iir_num_taps)
+                 + tuple(getattr(stage, name) for name in EXECUTION_SETTINGS), stage.filter_coeffs)
+                for stage in self.stages]
+
+    @staticmethod
+    def _same_designs(designs, previous):
+        # 系数按对象比较：重新设计总会得到新的数组（或缓存中的另一个数组）
+        return (previous is not None and len(designs) == len(previous)
+                and all(params == old_params and coeffs is old_coeffs
+                        for (params, coeffs), (old_params, old_coeffs) in zip(designs, previous)))
+
+    def apply(self, audio_data):
+        """
+        对整段音频应用滤波器链。
+        :param audio_data: 输入音频数据（numpy 数组）
+        :return: 滤波后的音频数据
+        """
+        for fused in self.fuse():
+            audio_data = fused.apply_current_filter(audio_data)
+        return audio_data
+
+    def process_block(self, block):
+        """
+        流式处理一个音频块，各合并后的滤波器在调用之间保持各自的状态。
+        """
+        for fused in self.fuse():
+            block = fused.process_block(block)
+        return block
+
+    def reset_state(self):
+        for fused in self.fuse():
+            fused.reset_state()
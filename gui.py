@@ -1,11 +1,22 @@
+import time
+_start_time = time.perf_counter()  # 冷启动计时起点
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from audio_io import read_audio, play_audio
-from fir_filter import Filter
+from audio_io import open_audio, decode_compressed, PlaybackEngine, quantize_to_int16
+from perf_stats import perf_stats
+from waveform_view import WaveformView
 import threading
+import copy
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import sosfreqz, freqz
+# scipy.signal（fir_filter、equalizer）、matplotlib 和 pydub 在第一次使用时才导入，缩短启动时间
+
+
+def _preload_modules():
+    """
+    窗口显示后在后台导入滤波模块，第一次加载文件时不再等待 scipy.signal 导入。
+    """
+    import fir_filter  # noqa: F401
+    import equalizer  # noqa: F401
 
 class AudioProcessingApp:
     def __init__(self, root):
@@ -16,12 +27,22 @@ class AudioProcessingApp:
         self.audio_data = None
         self.filtered_audio = None
         self.filter = None
-        self.stop_event = threading.Event()  # 用于控制播放线程
         self.audio_data_lock = threading.Lock()  # 用于同步音频数据更新
         self.is_paused = True  # 标记当前是否暂停播放
-        self.play_thread = None  # 保存播放线程
+        self.playback = None  # 播放引擎，暂停/继续时保持同一个音频设备
+        self.playback_buffer_chunks = 8  # 播放缓冲区块数：越大越不易断音，滤波器改动生效越慢
+        self.render_cancel = None  # 当前后台渲染任务的取消标志
+        self._design_job = 0  # 每次应用滤波器、切换类型或文件时递增，过期的后台设计结果被丢弃
+        self.stats_window = None  # 性能统计面板
+        self.equalizer = None  # 图形均衡器，在主滤波器之后应用
+        self.eq_window = None
+        self._eq_render_job = None  # 调节均衡器后延迟触发的重新渲染
         self.current_position = 0  # 当前播放位置（样本索引）
         self.num = 1  # 自定义滤波器阶数
+        self.realtime_filtering = True  # 播放时逐块实时滤波，而不是预先渲染整段音频
+        self.dither = False  # 量化为 int16 时是否加入抖动
+        self.decode_pending = False  # 压缩文件仍在后台完整解码，此时 audio_data 是按需解码的 IndexedAudio
+        self._play_requested_at = None  # 按下播放的时刻，用于测量首个音频输出延迟
 
         # 文件选择按钮
         tk.Button(root, text="选择音频文件", command=self.load_file).pack(pady=5)
@@ -35,6 +56,13 @@ class AudioProcessingApp:
         tk.Label(root, text="输入滤波器阶数:").pack()
         self.num_entry = tk.Entry(root)
         self.num_entry.pack()
+
+        # 按指标自动设计：填写过渡带宽度时忽略阶数，设计满足指标的最低阶 FIR/IIR
+        tk.Label(root, text="过渡带宽度 (Hz，填写时按指标自动设计最低阶):").pack()
+        self.transition_entry = tk.Entry(root)
+        self.transition_entry.pack()
+        self.passband_ripple = 0.1  # 按指标设计时的通带纹波（dB）
+        self.stopband_attenuation = 60  # 按指标设计时的阻带衰减（dB）
   
 
         # 绘制频响曲线
@@ -44,6 +72,14 @@ class AudioProcessingApp:
         # 应用滤波器按钮
         tk.Button(root, text="应用滤波器", command=self.apply_filter).pack(pady=5)
 
+        # 实时滤波开关
+        self.realtime_var = tk.BooleanVar(value=self.realtime_filtering)
+        tk.Checkbutton(root, text="实时滤波（边播放边滤波）", variable=self.realtime_var,
+                       command=self.toggle_realtime).pack()
+        self.dither_var = tk.BooleanVar(value=self.dither)
+        tk.Checkbutton(root, text="量化抖动（dither）", variable=self.dither_var,
+                       command=self.toggle_dither).pack()
+
         # 截止频率输入框
         self.cutoff_frame = tk.Frame(root)
         self.cutoff_frame.pack()
@@ -59,6 +95,12 @@ class AudioProcessingApp:
         tk.OptionMenu(root, self.filter_type, "none", "lowpass", "highpass", "bandpass", "bandstop").pack()
 
 
+        # 图形均衡器
+        tk.Button(root, text="均衡器", command=self.show_equalizer).pack()
+
+        # 性能统计面板
+        tk.Button(root, text="性能统计", command=self.show_stats_panel).pack()
+
         # 播放按钮
         self.play_button = tk.Button(root, text="播放", command=self.toggle_play_pause)
         self.play_button.pack(pady=5)
@@ -67,23 +109,92 @@ class AudioProcessingApp:
         self.current_file_label = tk.Label(root, text="当前播放：无", font=("Arial", 12))
         self.current_file_label.pack(pady=5)
 
+        # 后台渲染进度
+        self.render_status_label = tk.Label(root, text="")
+        self.render_status_label.pack()
+
+        # 波形/频谱查看器（滚轮缩放，拖动平移）
+        self.waveform_view = WaveformView(root)
+        self.waveform_view.pack(pady=5)
+        self.update_playhead()
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after_idle(self._report_startup)
+
+    def _report_startup(self):
+        """
+        主循环开始处理事件时输出冷启动耗时，然后在后台预先导入滤波模块。
+        """
+        seconds = time.perf_counter() - _start_time
+        perf_stats.record("cold_start", seconds)
+        print(f"冷启动: {seconds * 1000:.0f} ms")
+        threading.Thread(target=_preload_modules, daemon=True).start()
+
     def load_file(self):
         """
         选择音频文件并加载音频数据。
         """
         self.file_path = filedialog.askopenfilename(filetypes=[("Audio Files", "*.wav *.mp3 *.aac")])
         if self.file_path:
+            self.stop_playback()
+            self.cancel_render()
+            if self.eq_window is not None and self.eq_window.winfo_exists():
+                self.eq_window.destroy()
+            self.equalizer = None  # 采样率可能改变，均衡器随新文件重建
+            self._design_job += 1
             try:
-                self.sample_rate, self.audio_data, duration = read_audio(self.file_path)
+                from fir_filter import Filter
+                start = time.perf_counter()
+                self.sample_rate, self.audio_data, duration, self.decode_pending = open_audio(self.file_path)
+                print(f"打开 {self.file_path.split('/')[-1]}: {(time.perf_counter() - start) * 1000:.0f} ms")
                 self.filtered_audio = self.audio_data
                 # 匹配之前的的改动  默认使用FIR滤波器
                 self.filter = Filter(self.sample_rate, "FIR")
+                if self.decode_pending:
+                    # 未缓存的压缩文件：先按帧索引按需解码以便立即播放，完整解码完成后再显示波形、渲染
+                    self.waveform_view.clear()
+                    self.render_status_label.config(text="后台解码中，可以开始播放")
+                    threading.Thread(target=self._decode_worker, args=(self.file_path,), daemon=True).start()
+                else:
+                    self.waveform_view.set_audio(self.filtered_audio, self.sample_rate)
                 # 更新当前播放音频的标签
                 self.current_file_label.config(text=f"当前播放：{self.file_path.split('/')[-1]}")
-                messagebox.showinfo("成功", f"加载音频文件成功！时长: {duration:.2f} 秒")
+                messagebox.showinfo("成功", f"加载音频文件成功！时长: {duration:.2f} 秒，声道数: {self.audio_data.shape[1]}")
             except Exception as e:
                 messagebox.showerror("错误", f"无法加载音频文件: {e}")
 
+    def _decode_worker(self, file_path):
+        """
+        后台完整解码压缩文件（结果写入解码缓存，下次打开直接内存映射）。
+        """
+        try:
+            _, frames = decode_compressed(file_path)
+        except Exception as e:
+            self.root.after(0, self.render_status_label.config, {"text": f"后台解码失败: {e}"})
+            return
+        self.root.after(0, self._decode_finished, file_path, frames)
+
+    def _decode_finished(self, file_path, frames):
+        """
+        完整解码完成：把按需解码的数据换成完整数组，显示波形，并渲染已经应用的滤波器。
+        """
+        if file_path != self.file_path or not self.decode_pending:
+            return  # 解码期间已经切换了文件
+        with self.audio_data_lock:
+            if self.filtered_audio is self.audio_data:
+                self.filtered_audio = frames
+            self.audio_data = frames
+            self.decode_pending = False
+        self.render_status_label.config(text="")
+        self.waveform_view.set_audio(self.filtered_audio, self.sample_rate)
+        # 与 FilterChain.fuse 相同的判断：FFT 设计没有系数，只有频域掩码
+        if self.filter.type == "FFT":
+            designed = self.filter._has_fft_mask()
+        else:
+            designed = self.filter.filter_coeffs is not None
+        if designed or (self.equalizer is not None and not self.equalizer.is_flat()):
+            self.render_filtered_audio()
+
     def get_filtered_audio(self):
         """
         获取当前滤波后的音频数据。
@@ -100,8 +211,10 @@ class AudioProcessingApp:
             return
 
         filter_type = self.filter_type.get()
-        self.num = int(self.num_entry.get())
+        self._design_job += 1
         try:
+            order = self.num_entry.get().strip()
+            self.num = int(order) if order else None  # 留空时使用默认阶数
 
             # 低通和高通滤波器
 
@@ -111,13 +224,8 @@ class AudioProcessingApp:
                 if not cutoff or not cutoff.isdigit() or float(cutoff) <= 0:
                     messagebox.showerror("错误", "请输入有效的截止频率 (Hz)")
                     return
-                cutoff = float(cutoff)
-                if self.filter.type == "FIR":
-                    self.filter.design_FIR_filter(filter_type, cutoff, self.num)
-                elif self.filter.type == "IIR":
-                    self.filter.design_IIR_filter(filter_type, cutoff, self.num)
-                elif self.filter.type == "FFT":
-                    self.filter.design_fft_filter(filter_type, cutoff)
+                if self.design_filter(filter_type, float(cutoff)):
+                    return  # 按指标设计在后台进行，完成后由 _spec_design_finished 应用
 
             # 带通和带阻滤波器
 
@@ -133,25 +241,208 @@ class AudioProcessingApp:
                 if low_cutoff <= 0 or high_cutoff <= 0 or low_cutoff >= high_cutoff:
                     messagebox.showerror("错误", "低截止频率必须小于高截止频率，且均为正值")
                     return
-                if self.filter.type == "FIR":
-                    self.filter.design_FIR_filter(filter_type, [low_cutoff, high_cutoff], self.num)
-                elif self.filter.type == "IIR":
-                    self.filter.design_IIR_filter(filter_type, [low_cutoff, high_cutoff], self.num)
-                elif self.filter.type == "FFT":
-                    self.filter.design_fft_filter(filter_type, [low_cutoff, high_cutoff])
+                if self.design_filter(filter_type, [low_cutoff, high_cutoff]):
+                    return
 
             # 未应用滤波器设置
 
             else:
-                self.filter.filter_coeffs = None
+                with self.audio_data_lock:
+                    self.filter.filter_coeffs = None
+                    self.filter.filter_type = "none"
+                    self.filter.reset_state()
 
-            # 动态更新滤波器应用到音频数据
-            with self.audio_data_lock:
-                self.filtered_audio = self.filter.apply_current_filter(self.audio_data)
-                self.filtered_audio = np.clip(self.filtered_audio, -32768, 32767).astype(np.int16)
+            self._filter_applied()
+        except ValueError as e:
+            messagebox.showerror("错误", f"请输入有效的截止频率、阶数和过渡带宽度: {e}")
+
+    def _filter_applied(self, report=None):
+        """
+        新设计已装入当前滤波器：渲染并提示。
+        实时滤波时由播放线程逐块滤波，后台只为查看器渲染预览；否则预先渲染整段音频。
+        """
+        self.render_filtered_audio()
+        if report:
+            messagebox.showinfo("成功", f"滤波器设置应用\n按指标设计: {report['method']} {report['order']} 阶, "
+                                        f"每样本 {report['mults_per_sample']} 次乘法")
+        else:
             messagebox.showinfo("成功", "滤波器设置应用")
-        except ValueError:
-            messagebox.showerror("错误", "请输入有效的截止频率")
+
+    def design_filter(self, filter_type, cutoff):
+        """
+        按界面设置设计当前滤波器；填写了过渡带宽度时按指标设计最低阶 FIR/IIR。
+        :return: 按指标设计已在后台开始时返回 True，否则已同步设计完成，返回 False
+        """
+        transition = self.transition_entry.get().strip()
+        if transition and self.filter.type in ("FIR", "IIR"):
+            spec = (filter_type, cutoff, float(transition), self.passband_ripple, self.stopband_attenuation)
+            # 搜索最低阶数可能需要数秒：在后台线程中对副本设计（结果进入设计缓存），界面和播放都不被阻塞
+            self.render_status_label.config(text="正在按指标搜索最低阶数...")
+            threading.Thread(target=self._spec_design_worker,
+                             args=(copy.copy(self.filter), spec, self._design_job), daemon=True).start()
+            return True
+        with self.audio_data_lock:
+            if self.filter.type == "FIR":
+                self.filter.design_FIR_filter(filter_type, cutoff, self.num)
+            elif self.filter.type == "IIR":
+                self.filter.design_IIR_filter(filter_type, cutoff, self.num)
+            elif self.filter.type == "FFT":
+                self.filter.design_fft_filter(filter_type, cutoff)
+        return False
+
+    def _spec_design_worker(self, designer, spec, job):
+        """
+        后台线程：在滤波器副本上搜索满足指标的最低阶设计，完成后回到 Tk 主线程装入。
+        """
+        try:
+            designer.design_from_spec(*spec)
+        except ValueError as e:
+            self.root.after(0, self._spec_design_failed, job, e)
+            return
+        self.root.after(0, self._spec_design_finished, designer.type, spec, job)
+
+    def _spec_design_finished(self, type_of_filter, spec, job):
+        if job != self._design_job or self.filter is None or self.filter.type != type_of_filter:
+            return  # 设计期间又应用了新的滤波器，或切换了滤波器类型、音频文件
+        with self.audio_data_lock:
+            report = self.filter.design_from_spec(*spec)  # 命中设计缓存，只装入结果
+        self.render_status_label.config(text="")
+        self._filter_applied(report)
+
+    def _spec_design_failed(self, job, error):
+        if job != self._design_job:
+            return
+        self.render_status_label.config(text="")
+        messagebox.showerror("错误", f"无法按指标设计滤波器: {error}")
+
+    def render_filtered_audio(self):
+        """
+        在后台线程中对整段音频应用当前滤波器。
+        新的渲染会取消仍在进行的渲染；从当前播放位置开始的部分先渲染并立即替换，
+        其余部分随后完成。实时滤波模式下播放线程自己滤波，渲染结果只作为查看器的预览。
+        """
+        self.cancel_render()
+        if self.decode_pending:
+            return  # 完整解码完成后由 _decode_finished 渲染；实时滤波模式下播放已经使用新滤波器
+        cancel = threading.Event()
+        self.render_cancel = cancel
+        start = self.playback.position if self.playback is not None else self.current_position
+        # 渲染线程使用滤波器的副本，避免与播放线程共享流式状态
+        with self.audio_data_lock:
+            stages = [copy.copy(self.filter)]
+            if self.equalizer is not None and not self.equalizer.is_flat():
+                stages.append(copy.copy(self.equalizer))
+        for stage in stages:
+            stage.reset_state()
+        threading.Thread(target=self._render_worker,
+                         args=(stages, self.audio_data, start, cancel, self.realtime_filtering),
+                         daemon=True).start()
+
+    def cancel_render(self):
+        """
+        取消正在进行的后台渲染。
+        """
+        if self.render_cancel is not None:
+            self.render_cancel.set()
+            self.render_cancel = None
+
+    def _render_worker(self, stages, audio_data, start, cancel, preview=False):
+        """
+        后台渲染线程：依次经过各滤波阶段（主滤波器、均衡器）按段滤波，先渲染 [start, 结尾)，再渲染 [0, start)。
+        FIR/IIR 逐段调用 process_block 并在每个区间前做预热；
+        FFT 滤波是非因果的，分段会在边界产生误差，因此整段一次计算。
+        preview 为 True 时只更新查看器，不替换用于播放的 filtered_audio。
+        """
+        n_samples = len(audio_data)
+        start = min(start, n_samples)
+        segment = self.sample_rate * 5
+        warmup = 0
+        for stage in stages:
+            if stage.filter_coeffs is None:
+                continue
+            if stage.type == "FIR":
+                warmup += len(stage.filter_coeffs)  # FIR 预热长度等于滤波器长度时结果精确
+            elif stage.type == "IIR":
+                warmup += stage._iir_warmup()  # 冲激响应尾部能量足够小所需的长度（低截止频率时可达数秒）
+        whole = any(stage.type == "FFT" for stage in stages)
+        with self.audio_data_lock:
+            # 未渲染部分暂时保留旧结果；预览从原始音频开始
+            output = np.array(audio_data if preview else self.filtered_audio, dtype=np.int16)
+        label = "预览渲染" if preview else "渲染"
+        swapped = False
+        done = 0
+
+        def run_stages(block):
+            for stage in stages:
+                block = stage.apply_current_filter(block) if whole else stage.process_block(block)
+            return block
+
+        if whole:
+            regions = ((0, n_samples),)
+        else:
+            regions = ((start, n_samples), (0, start))
+        for region_start, region_end in regions:
+            if region_end <= region_start:
+                continue
+            for stage in stages:
+                stage.reset_state()
+            if whole:
+                bounds = [(region_start, region_end)]
+            else:
+                run_stages(audio_data[max(0, region_start - warmup):region_start])
+                bounds = [(i, min(i + segment, region_end)) for i in range(region_start, region_end, segment)]
+
+            for seg_start, seg_end in bounds:
+                if cancel.is_set():
+                    return
+                filtered = run_stages(audio_data[seg_start:seg_end])
+                with self.audio_data_lock:
+                    if cancel.is_set():
+                        return
+                    # 浮点结果只在这里量化一次，直接写入预分配的输出数组
+                    quantize_to_int16(filtered, output[seg_start:seg_end], self.dither)
+                    if not swapped and not preview:
+                        # 播放位置之后的第一段完成后立即替换，新滤波器马上可以听到
+                        self.filtered_audio = output
+                        swapped = True
+                self.root.after(0, self.waveform_view.update_region, output, seg_start, seg_end)
+                done += seg_end - seg_start
+                self.root.after(0, self.render_status_label.config,
+                                {"text": f"{label}进度: {100 * done / max(n_samples, 1):.0f}%"})
+
+        self.root.after(0, self.render_status_label.config, {"text": f"{label}完成"})
+
+    def toggle_realtime(self):
+        """
+        切换实时滤波模式。
+        """
+        self.realtime_filtering = self.realtime_var.get()
+        if self.filter is None or self.audio_data is None:
+            return
+        if self.realtime_filtering:
+            # 播放原始音频，由播放线程逐块滤波；查看器显示后台渲染的预览
+            self.cancel_render()
+            with self.audio_data_lock:
+                self.filtered_audio = self.audio_data
+                self.filter.reset_state()
+        self.render_filtered_audio()
+
+    def toggle_dither(self):
+        self.dither = self.dither_var.get()
+        if self.playback is not None:
+            self.playback.dither = self.dither
+
+    def process_block(self, block):
+        """
+        播放线程调用：实时滤波模式下对即将播放的块进行滤波。
+        """
+        with self.audio_data_lock:
+            if not self.realtime_filtering:
+                return block
+            block = self.filter.process_block(block)
+            if self.equalizer is not None:
+                block = self.equalizer.process_block(block)
+            return block
 
     def toggle_play_pause(self):
         """
@@ -163,49 +454,159 @@ class AudioProcessingApp:
 
         if self.is_paused:
             # 恢复播放
+            self._play_requested_at = time.perf_counter()
+            try:
+                if self.playback is None:
+                    self.playback = PlaybackEngine(self.sample_rate, self.audio_data.shape[1], self.get_filtered_audio,
+                                                   self.process_block, buffer_chunks=self.playback_buffer_chunks,
+                                                   on_finished=self._on_playback_finished, dither=self.dither)
+                    self.playback.seek(self.current_position)
+                elif self.playback.finished:
+                    self.playback.seek(0)
+                self.playback.resume()
+            except Exception as e:
+                messagebox.showerror("错误", f"播放音频时出错: {e}")
+                return
             self.is_paused = False
-            self.stop_event.clear()
             self.play_button.config(text="暂停")
-            if not self.play_thread or not self.play_thread.is_alive():
-                self.play_thread = threading.Thread(target=self._play_audio_thread)
-                self.play_thread.start()
+            # 更新当前播放音频的标签（确保在播放时显示）
+            self.current_file_label.config(text=f"当前播放：{self.file_path.split('/')[-1]}")
         else:
             # 暂停播放
             self.is_paused = True
-            self.stop_event.set()
+            self.playback.pause()
+            self.current_position = self.playback.position
             self.play_button.config(text="播放")
 
-    def _play_audio_thread(self):
+    def update_playhead(self):
         """
-        播放音频线程。
+        每 100 毫秒在查看器中更新播放位置。
         """
-        try:
-            def get_audio_data():
-                """
-                动态获取滤波后的音频数据。
-                """
-                with self.audio_data_lock:
-                    return self.filtered_audio
+        if self.playback is not None:
+            self.waveform_view.set_playhead(self.playback.position)
+            first_audio = self.playback.first_audio_time
+            if self._play_requested_at is not None and first_audio is not None:
+                seconds = first_audio - self._play_requested_at
+                self._play_requested_at = None
+                perf_stats.record("time_to_first_audio", seconds)
+                print(f"首个音频输出延迟: {seconds * 1000:.0f} ms")
+        self.root.after(100, self.update_playhead)
+
+    def _on_playback_finished(self):
+        """
+        播放引擎在音频线程中调用，转到 Tk 主线程更新界面。
+        """
+        self.root.after(0, self._playback_finished)
+
+    def _playback_finished(self):
+        self.is_paused = True
+        self.current_position = 0
+        self.play_button.config(text="播放")
+        if self.playback is not None and self.playback.error is not None:
+            # 播放因错误停止：显示错误，并停在出错位置，修正后可以从这里继续播放
+            error = self.playback.error
+            self.current_position = self.playback.position
+            self.playback.seek(self.current_position)
+            messagebox.showerror("错误", f"播放音频时出错: {error}")
+
+    def stop_playback(self):
+        """
+        停止播放并释放播放引擎（切换文件或退出时调用）。
+        """
+        if self.playback is not None:
+            self.playback.close()
+            self.playback = None
+        self.is_paused = True
+        self.current_position = 0
+        self.play_button.config(text="播放")
+
+    def on_close(self):
+        self.stop_playback()
+        self.root.destroy()
+
+    def show_equalizer(self):
+        """
+        打开 10 段图形均衡器窗口，每个频段一个增益滑块（±12 dB）。
+        """
+        if self.audio_data is None:
+            messagebox.showerror("错误", "请先加载音频文件")
+            return
+        if self.eq_window is not None and self.eq_window.winfo_exists():
+            self.eq_window.lift()
+            return
+        if self.equalizer is None:
+            from equalizer import Equalizer
+            self.equalizer = Equalizer(self.sample_rate)
+        self.eq_window = tk.Toplevel(self.root)
+        self.eq_window.title("均衡器")
+        self.eq_scales = []
+        sliders = tk.Frame(self.eq_window)
+        sliders.pack()
+        for index, (center, gain_db, _) in enumerate(self.equalizer.bands):
+            label = f"{center / 1000:g}k" if center >= 1000 else f"{center:g}"
+            scale = tk.Scale(sliders, from_=12, to=-12, resolution=0.5, label=label, length=160,
+                             command=lambda value, index=index: self.set_eq_gain(index, float(value)))
+            scale.set(gain_db)
+            scale.pack(side=tk.LEFT)
+            self.eq_scales.append(scale)
+        tk.Button(self.eq_window, text="重置", command=self.reset_equalizer).pack()
+
+    def set_eq_gain(self, index, gain_db):
+        """
+        调节一个频段的增益。实时滤波时播放线程下一个块即生效（只重算该频段，滤波状态保留）；
+        后台渲染在停止拖动 300 毫秒后才重新开始，避免拖动过程中反复渲染。
+        """
+        if self.equalizer is None or self.equalizer.bands[index][1] == gain_db:
+            return
+        with self.audio_data_lock:
+            self.equalizer.set_gain(index, gain_db)
+        if self._eq_render_job is not None:
+            self.root.after_cancel(self._eq_render_job)
+        self._eq_render_job = self.root.after(300, self._render_after_eq_change)
 
-            # 更新当前播放音频的标签（确保在播放时显示）
-            self.current_file_label.config(text=f"当前播放：{self.file_path.split('/')[-1]}")
-            self.current_position = play_audio(self.sample_rate, get_audio_data, self.stop_event, self.current_position)
-        except Exception as e:
-            messagebox.showerror("错误", f"播放音频时出错: {e}")
-        finally:
-            self.stop_event.set()
-            self.play_button.config(text="播放")
+    def _render_after_eq_change(self):
+        self._eq_render_job = None
+        self.render_filtered_audio()
+
+    def reset_equalizer(self):
+        for scale in self.eq_scales:
+            scale.set(0)  # 触发 set_eq_gain
 
-    def play_audio(self):
+    def show_stats_panel(self):
         """
-        播放音频，支持动态更新。
+        打开性能统计面板，并开启统计。
         """
-        if self.filtered_audio is None:
-            messagebox.showerror("错误", "请先加载音频文件并应用滤波器")
+        perf_stats.enable()
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
             return
-
-        self.stop_event.clear()
-        threading.Thread(target=play_audio, args=(self.sample_rate, self.get_filtered_audio, self.stop_event)).start()
+        self.stats_window = tk.Toplevel(self.root)
+        self.stats_window.title("性能统计")
+        self.stats_text = tk.Text(self.stats_window, width=90, height=14)
+        self.stats_text.pack()
+        buttons = tk.Frame(self.stats_window)
+        buttons.pack()
+        tk.Button(buttons, text="清零", command=perf_stats.reset).pack(side=tk.LEFT)
+        tk.Button(buttons, text="导出 JSON", command=self.export_stats).pack(side=tk.LEFT)
+        self.refresh_stats_panel()
+
+    def refresh_stats_panel(self):
+        """
+        每 500 毫秒刷新一次统计面板。
+        """
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            return
+        text = perf_stats.format_text()
+        if self.playback is not None:
+            text += f"\n播放缓冲区断音: {self.playback.underruns}"
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, text)
+        self.root.after(500, self.refresh_stats_panel)
+
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            perf_stats.dump_json(path)
 
     def update_cutoff_inputs(self, *args):
         """
@@ -240,15 +641,20 @@ class AudioProcessingApp:
             messagebox.showerror("错误", "请先加载音频文件")
             return
 
-        if self.filter.type == "FIR":
-            self.filter.type = "IIR"
-            self.type_of_filter_button.config(text="IIR")
-        elif self.filter.type == "IIR":
-            self.filter.type = "FFT"
-            self.type_of_filter_button.config(text="FFT")
-        else:
-            self.filter.type = "FIR"
-            self.type_of_filter_button.config(text="FIR")
+        next_type = {"FIR": "IIR", "IIR": "FFT"}.get(self.filter.type, "FIR")
+        self._design_job += 1  # 正在进行的按指标设计属于旧类型，结果作废
+        with self.audio_data_lock:
+            # 已设计的系数只适用于原来的实现（FIR 系数与 IIR 的 SOS 矩阵形状不同），
+            # 实时滤波时播放线程会立即使用新类型，因此清空设计，直到重新应用滤波器
+            self.filter.type = next_type
+            self.filter.filter_coeffs = None
+            self.filter.filter_type = "none"
+            self.filter.design_spec = None
+            self.filter.design_report = None
+            self.filter.reset_state()
+        self.type_of_filter_button.config(text=next_type)
+        if self.realtime_filtering and self.audio_data is not None:
+            self.render_filtered_audio()  # 实时滤波时播放已不再滤波，查看器也恢复显示原始信号
 
     def plot_frequency_response(self):
         """
@@ -258,11 +664,9 @@ class AudioProcessingApp:
             messagebox.showerror("错误", "请先加载音频文件并应用滤波器")
             return
         
-        # 绘制频响曲线
-        if self.filter.type == "FIR":
-            w, h = freqz(self.filter.filter_coeffs, worN=20000, fs=self.sample_rate)
-        else:
-            w, h = sosfreqz(self.filter.filter_coeffs, 20000, fs=self.sample_rate)
+        import matplotlib.pyplot as plt  # 第一次绘图时才导入 matplotlib
+        # 绘制频响曲线（频率响应按设计参数缓存）
+        w, h = self.filter.frequency_response(20000)
         
         fig = plt.figure()
         ax = fig.add_subplot(1, 1, 1)
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# 缓存目录可通过环境变量修改
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SIMPLE_AUDIO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "simple_audio_process", "pcm"))
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 缓存总大小上限 2 GB
+
+
+class PCMCache:
+    """
+    压缩音频（MP3/AAC）解码结果的磁盘缓存。
+    每个文件的 PCM 数据保存为 .npy，以路径、文件大小和修改时间作为键，
+    再次加载时以内存映射方式打开，无需重新解码。超出容量时按最近最少使用（LRU）淘汰。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _key(self, file_path):
+        """
+        由绝对路径、文件大小和修改时间生成缓存键，源文件改动后旧缓存自然失效。
+        """
+        st = os.stat(file_path)
+        ident = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npy", base + ".json"
+
+    def index_path(self, file_path):
+        """
+        压缩文件帧索引（见 seek_index）的保存路径，与解码缓存使用相同的键。
+        """
+        return os.path.join(self.cache_dir, self._key(file_path) + ".idx.npz")
+
+    def load(self, file_path):
+        """
+        读取缓存的 PCM 数据。
+        :param file_path: 源音频文件路径
+        :return: (采样率, 形状为 (帧数, 声道数) 的内存映射数组)，未命中时返回 None
+        """
+        data_path, meta_path = self._paths(self._key(file_path))
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            frames = np.load(data_path, mmap_mode="r")
+            # 更新修改时间作为最近使用时间（很多系统的 atime 不可靠）
+            os.utime(data_path)
+        except (OSError, ValueError):
+            return None
+        return meta["sample_rate"], frames
+
+    def store(self, file_path, sample_rate, frames):
+        """
+        写入解码后的 PCM 数据，写入后按容量上限淘汰旧条目。
+        :param file_path: 源音频文件路径
+        :param sample_rate: 采样率
+        :param frames: 形状为 (帧数, 声道数) 的 numpy 数组
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, meta_path = self._paths(self._key(file_path))
+        # 先写临时文件再改名，避免并发读取到写了一半的缓存
+        tmp_path = data_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(frames))
+        os.replace(tmp_path, data_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"sample_rate": sample_rate, "source": os.path.abspath(file_path)}, f)
+        self.evict()
+
+    def evict(self):
+        """
+        按最近使用时间从旧到新删除缓存条目，直到总大小不超过上限。
+        """
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".npy")]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            base = path[:-len(".npy")]
+            for p in (path, base + ".json", base + ".idx.npz"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+
+    def clear(self):
+        """
+        清空缓存目录中的所有条目。
+        """
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
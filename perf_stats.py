@@ -0,0 +1,103 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class PerfStats:
+    """
+    可选的性能统计。默认关闭，关闭时各统计点几乎没有开销。
+    按阶段记录调用次数、耗时、处理的帧数和字节数，并统计播放断音等事件计数。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    @contextmanager
+    def stage(self, name, frames=0, nbytes=0, sample_rate=None):
+        """
+        统计一个阶段的耗时。
+        :param name: 阶段名称（如 'decode'、'design'、'filter'、'quantize'、'stream_write'）
+        :param frames: 本次处理的帧数（样本数）
+        :param nbytes: 本次处理的字节数
+        :param sample_rate: 采样率，用于计算实时倍率
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, frames, nbytes, sample_rate)
+
+    def record(self, name, seconds, frames=0, nbytes=0, sample_rate=None):
+        """
+        直接记录一次阶段耗时。
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                                   "frames": 0, "bytes": 0, "audio_seconds": 0.0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["frames"] += frames
+            stats["bytes"] += nbytes
+            if sample_rate:
+                stats["audio_seconds"] += frames / sample_rate
+
+    def increment(self, name, count=1):
+        """
+        增加事件计数（如 'playback_underruns'、'late_writes'）。
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + count
+
+    def snapshot(self):
+        """
+        返回当前统计结果的副本，各阶段附带实时倍率（处理的音频时长 / 耗时）。
+        """
+        with self._lock:
+            stages = {name: dict(stats) for name, stats in self._stages.items()}
+            counters = dict(self._counters)
+        for stats in stages.values():
+            stats["realtime_factor"] = stats["audio_seconds"] / stats["seconds"] if stats["seconds"] > 0 else None
+        return {"stages": stages, "counters": counters}
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def format_text(self):
+        """
+        生成便于显示的文本摘要。
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, stats in sorted(snapshot["stages"].items()):
+            line = (f"{name}: {stats['calls']} 次, {stats['seconds'] * 1000:.1f} ms, "
+                    f"最长 {stats['max_seconds'] * 1000:.2f} ms, {stats['bytes'] / 1024 ** 2:.1f} MB")
+            if stats["realtime_factor"] is not None and stats["audio_seconds"] > 0:
+                line += f", {stats['realtime_factor']:.1f}x 实时"
+            lines.append(line)
+        for name, count in sorted(snapshot["counters"].items()):
+            lines.append(f"{name}: {count}")
+        return "\n".join(lines)
+
+
+perf_stats = PerfStats()  # 全局统计实例，audio_io 与 fir_filter 共用
@@ -0,0 +1,304 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# MPEG-1/2/2.5 Layer III 比特率表（kbps），下标为帧头中的比特率索引
+MP3_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+AAC_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+MP3_DECODER_DELAY = 529  # ffmpeg 按 LAME 标签跳过开头时额外跳过的解码器延迟（样本）
+PREROLL_FRAMES = {"mp3": 4, "aac": 2}  # 从中间开始解码时向前多解的帧数：覆盖比特池和 MDCT 重叠
+
+
+def _mp3_header(data, pos):
+    """
+    解析 pos 处的 MP3（Layer III）帧头。
+    :return: (帧长度字节数, 采样率, 每帧样本数, 声道数, 版本 ID)，不是有效帧头时返回 None
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 3
+    layer = (data[pos + 1] >> 1) & 3
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # 保留值、非 Layer III 或自由比特率
+    padding = (data[pos + 2] >> 1) & 1
+    n_channels = 1 if data[pos + 3] >> 6 == 3 else 2
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = MP3_BITRATES["mpeg1" if version == 3 else "mpeg2"][bitrate_index] * 1000
+    samples_per_frame = 1152 if version == 3 else 576
+    frame_length = samples_per_frame // 8 * bitrate // sample_rate + padding
+    return frame_length, sample_rate, samples_per_frame, n_channels, version
+
+
+def _mp3_gapless_skip(data, pos, version, n_channels):
+    """
+    检查第一帧是否为 Xing/Info 信息帧（不含音频）。
+    :return: (是否为信息帧, ffmpeg 完整解码时在开头跳过的样本数)
+    """
+    side_info = (32 if n_channels == 2 else 17) if version == 3 else (17 if n_channels == 2 else 9)
+    tag = pos + 4 + side_info
+    if data[tag:tag + 4] not in (b"Xing", b"Info"):
+        return False, 0
+    flags = int.from_bytes(data[tag + 4:tag + 8], "big")
+    lame = tag + 8 + 4 * bool(flags & 1) + 4 * bool(flags & 2) + 100 * bool(flags & 4) + 4 * bool(flags & 8)
+    if data[lame:lame + 4] not in (b"LAME", b"Lavf", b"Lavc"):
+        return True, 0
+    delay = (data[lame + 21] << 4) | (data[lame + 22] >> 4)  # 编码器延迟，12 位
+    return True, delay + MP3_DECODER_DELAY
+
+
+def _skip_id3(data):
+    """
+    跳过文件开头的 ID3v2 标签，返回第一个音频帧可能的起始位置。
+    """
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]  # 同步安全整数
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _adts_header(data, pos):
+    """
+    解析 pos 处的 AAC ADTS 帧头。
+    :return: (帧长度字节数, 采样率, 每帧样本数, 声道数)，不是有效帧头时返回 None
+    """
+    if pos + 7 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xF6 != 0xF0:
+        return None
+    rate_index = (data[pos + 2] >> 2) & 0xF
+    if rate_index >= len(AAC_SAMPLE_RATES):
+        return None
+    n_channels = ((data[pos + 2] & 1) << 2) | (data[pos + 3] >> 6)
+    frame_length = ((data[pos + 3] & 3) << 11) | (data[pos + 4] << 3) | (data[pos + 5] >> 5)
+    if frame_length < 7:
+        return None
+    samples_per_frame = 1024 * ((data[pos + 6] & 3) + 1)
+    return frame_length, AAC_SAMPLE_RATES[rate_index], samples_per_frame, n_channels
+
+
+class SeekIndex:
+    """
+    压缩音频（MP3 / ADTS AAC）的帧索引：每一帧在文件中的字节偏移。
+    只解析帧头，不解码音频，几百 MB 的文件也只需要一次顺序读取；
+    有了索引，从任意样本位置开始播放只需解码附近的几帧，而不是从头解码到该位置。
+    """
+
+    def __init__(self, audio_format, sample_rate, n_channels, samples_per_frame, offsets, skip=0):
+        """
+        :param audio_format: "mp3" 或 "aac"
+        :param sample_rate: 帧头中的采样率（HE-AAC 实际输出采样率可能是它的两倍）
+        :param n_channels: 帧头中的声道数
+        :param samples_per_frame: 每帧样本数
+        :param offsets: 各帧起始字节偏移，最后再附加最后一帧的结束偏移，长度为帧数 + 1
+        :param skip: 完整解码时开头被跳过的样本数（MP3 的编码器延迟），用于与完整解码结果对齐
+        """
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.n_channels = n_channels
+        self.samples_per_frame = samples_per_frame
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.skip = skip
+
+    @property
+    def n_frames(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def build(cls, file_path):
+        """
+        扫描文件中的所有帧头建立索引。
+        """
+        with open(file_path, "rb") as f:
+            data = f.read()
+        if file_path.endswith(".mp3"):
+            parse, audio_format, pos = _mp3_header, "mp3", _skip_id3(data)
+        elif file_path.endswith(".aac"):
+            parse, audio_format, pos = _adts_header, "aac", 0
+        else:
+            raise ValueError("Seek index supports only MP3 and ADTS AAC files.")
+
+        offsets = []
+        first = None
+        skip = 0
+        while pos < len(data):
+            header = parse(data, pos)
+            # 帧头可能与数据中的字节偶然相同：要求下一帧也紧接着出现（最后一帧除外）
+            if header is None or (pos + header[0] < len(data) and parse(data, pos + header[0]) is None):
+                pos += 1  # 失去同步（标签、损坏数据），逐字节重新寻找帧头
+                continue
+            if first is None:
+                first = header
+                if audio_format == "mp3":
+                    is_info, skip = _mp3_gapless_skip(data, pos, header[4], header[3])
+                    if is_info:
+                        pos += header[0]
+                        continue
+            offsets.append(pos)
+            pos += header[0]
+        if first is None or not offsets:
+            raise ValueError("No audio frames found.")
+        offsets.append(min(pos, len(data)))
+        return cls(audio_format, first[1], first[3], first[2], offsets, skip)
+
+    def save(self, path):
+        """
+        保存索引（先写临时文件再改名）。
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, offsets=self.offsets,
+                     meta=np.array([self.sample_rate, self.n_channels, self.samples_per_frame, self.skip]),
+                     audio_format=np.array(self.audio_format))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            sample_rate, n_channels, samples_per_frame, skip = (int(v) for v in data["meta"])
+            return cls(str(data["audio_format"]), sample_rate, n_channels, samples_per_frame,
+                       data["offsets"], skip)
+
+    def decode_frames(self, file_path, first, last):
+        """
+        只解码第 [first, last) 帧。
+        :return: (采样率, 形状为 (样本数, 声道数) 的 int16 数组)
+        """
+        from pydub import AudioSegment  # 按需导入：启动时不加载 pydub
+        with open(file_path, "rb") as f:
+            f.seek(self.offsets[first])
+            data = f.read(int(self.offsets[last] - self.offsets[first]))
+        audio = AudioSegment.from_file(io.BytesIO(data), format=self.audio_format)
+        samples = np.array(audio.get_array_of_samples(), dtype=np.int16).reshape(-1, audio.channels)
+        return audio.frame_rate, samples
+
+
+def load_seek_index(file_path, cache):
+    """
+    读取磁盘上保存的索引，没有时扫描文件建立并保存，下次打开同一文件无需再扫描。
+    :param cache: PCMCache，索引与解码缓存保存在同一目录，使用相同的键
+    """
+    path = cache.index_path(file_path)
+    try:
+        return SeekIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        pass
+    index = SeekIndex.build(file_path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index.save(path)
+    except OSError:
+        pass  # 缓存目录不可写时仅跳过保存
+    return index
+
+
+class IndexedAudio:
+    """
+    借助帧索引按需解码的压缩音频，可以像 (样本数, 声道数) 的 numpy 数组一样取长度和切片。
+    切片时只解码覆盖该范围的窗口（每个窗口若干秒），最近用过的窗口保留在内存中，
+    并在后台预先解码下一个窗口，顺序播放时窗口边界不会因等待解码而断音。
+    用于完整解码完成之前立即开始播放；完整解码完成后应换成普通数组。
+    """
+
+    ndim = 2
+    dtype = np.dtype(np.int16)
+
+    def __init__(self, file_path, index, window_seconds=4.0, max_windows=4):
+        """
+        :param file_path: 音频文件路径
+        :param index: SeekIndex
+        :param window_seconds: 每次解码的窗口长度（秒）
+        :param max_windows: 内存中保留的窗口数
+        """
+        self.file_path = file_path
+        self.index = index
+        self.window_frames = max(1, int(window_seconds * index.sample_rate / index.samples_per_frame))
+        self.max_windows = max_windows
+        self._windows = OrderedDict()
+        self._pending = {}  # 正在解码的窗口 -> threading.Event
+        self._lock = threading.Lock()
+        self._rate = index.sample_rate
+        # 解码第一个窗口，得到实际的输出采样率和声道数（HE-AAC 的 SBR/PS 会改变两者）
+        first = self._window(0)
+        self.sample_rate = self._rate
+        self.scale = self._rate // index.sample_rate  # 每个编码帧对应的输出样本数倍数
+        n_samples = index.n_frames * index.samples_per_frame * self.scale - index.skip
+        self.shape = (max(n_samples, 0), first.shape[1])
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def duration(self):
+        return len(self) / self.sample_rate
+
+    def _decode_window(self, window):
+        index = self.index
+        first = window * self.window_frames
+        last = min(first + self.window_frames, index.n_frames)
+        start = max(0, first - PREROLL_FRAMES[index.audio_format])
+        rate, samples = index.decode_frames(self.file_path, start, last)
+        self._rate = rate
+        need = (last - first) * index.samples_per_frame * rate // index.sample_rate
+        # 按结尾对齐：解码器可能丢弃开头缺少比特池数据的帧，但最后一帧总是完整输出
+        if len(samples) < need:
+            samples = np.concatenate([np.zeros((need - len(samples), samples.shape[1]), dtype=np.int16), samples])
+        return samples[len(samples) - need:]
+
+    def _window(self, window):
+        """
+        取得一个窗口的解码结果，同一窗口只解码一次（其他线程正在解码时等待）。
+        """
+        while True:
+            with self._lock:
+                if window in self._windows:
+                    self._windows.move_to_end(window)
+                    return self._windows[window]
+                event = self._pending.get(window)
+                if event is None:
+                    event = self._pending[window] = threading.Event()
+                    break
+            event.wait()
+        try:
+            samples = self._decode_window(window)
+            with self._lock:
+                self._windows[window] = samples
+                while len(self._windows) > self.max_windows:
+                    self._windows.popitem(last=False)
+            return samples
+        finally:
+            with self._lock:
+                del self._pending[window]
+            event.set()
+
+    def _prefetch(self, window):
+        if window * self.window_frames >= self.index.n_frames:
+            return
+        with self._lock:
+            if window in self._windows or window in self._pending:
+                return
+        threading.Thread(target=self._window, args=(window,), daemon=True).start()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("IndexedAudio supports only contiguous slices.")
+        start, stop, _ = key.indices(len(self))
+        if stop <= start:
+            return np.zeros((0, self.shape[1]), dtype=np.int16)
+        window_samples = self.window_frames * self.index.samples_per_frame * self.scale
+        # 输出位置加上 skip 才是解码流中的位置，与完整解码结果对齐
+        raw_start, raw_stop = start + self.index.skip, stop + self.index.skip
+        parts = []
+        last_window = 0
+        for window in range(raw_start // window_samples, (raw_stop - 1) // window_samples + 1):
+            samples = self._window(window)
+            base = window * window_samples
+            parts.append(samples[max(raw_start - base, 0):max(raw_stop - base, 0)])
+            last_window = window
+        self._prefetch(last_window + 1)
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
@@ -0,0 +1,495 @@
+import sys
+import time
+import random
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+import socketserver
+import urllib.request
+from urllib.parse import urlparse
+import pyaudio
+import numpy as np
+from audio_io import quantize_to_int16
+from perf_stats import perf_stats
+
+RECEIVE_BYTES = 16384  # 每次从网络读取的字节数
+
+
+class _PrefixedReader:
+    """
+    在原始流前拼接已读出的字节（格式探测时读取的文件头）。
+    """
+
+    def __init__(self, prefix, raw):
+        self._prefix = prefix
+        self._raw = raw
+
+    def read(self, n):
+        if self._prefix:
+            data, self._prefix = self._prefix[:n], self._prefix[n:]
+            return data
+        return self._raw.read(n)
+
+    def close(self):
+        self._raw.close()
+
+
+def _read_exact(reader, n):
+    """
+    读取恰好 n 个字节，流提前结束时返回已读到的部分。
+    """
+    parts = []
+    while n > 0:
+        data = reader.read(n)
+        if not data:
+            break
+        parts.append(data)
+        n -= len(data)
+    return b"".join(parts)
+
+
+def open_network_stream(url, timeout=10.0):
+    """
+    打开网络音频流，返回支持 read(n) 和 close() 的对象。
+    :param url: 'http://...'、'https://...' 或 'tcp://主机:端口'
+    :param timeout: 连接和读取的超时时间（秒）
+    """
+    parsed = urlparse(url)
+    if parsed.scheme in ("http", "https"):
+        return urllib.request.urlopen(url, timeout=timeout)
+    elif parsed.scheme == "tcp":
+        sock = socket.create_connection((parsed.hostname, parsed.port), timeout=timeout)
+        reader = sock.makefile("rb")
+        sock.close()  # makefile 持有底层连接，关闭 reader 时一并关闭
+        return reader
+    else:
+        raise ValueError(f"Unsupported stream URL: {url}")
+
+
+def read_wav_header(reader):
+    """
+    从流中逐块解析 WAV 头，读到 data 块为止。
+    :return: (采样率, 声道数, data 块字节数)，流式 WAV 的长度未知时字节数为 None
+    """
+    riff, _, wave_id = struct.unpack('<4sI4s', _read_exact(reader, 12))
+    if riff != b'RIFF' or wave_id != b'WAVE':
+        raise ValueError("Not a valid WAV stream.")
+    sample_rate = n_channels = None
+    while True:
+        header = _read_exact(reader, 8)
+        if len(header) < 8:
+            raise ValueError("WAV stream has no data chunk.")
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            fmt = _read_exact(reader, chunk_size + (chunk_size & 1))
+            audio_format, n_channels, sample_rate = struct.unpack('<HHI', fmt[:8])
+            bits = struct.unpack('<H', fmt[14:16])[0]
+            if audio_format not in (1, 0xFFFE) or bits != 16:
+                raise ValueError("Only 16-bit PCM WAV streams are supported.")
+        elif chunk_id == b'data':
+            if sample_rate is None:
+                raise ValueError("WAV stream has no fmt chunk before the data chunk.")
+            # 边生成边发送的 WAV（如 ffmpeg 输出到管道）把长度写为 0 或 0xFFFFFFFF
+            return sample_rate, n_channels, None if chunk_size in (0, 0xFFFFFFFF) else chunk_size
+        else:
+            _read_exact(reader, chunk_size + (chunk_size & 1))
+
+
+def iter_pcm_frames(reader, n_channels, data_size=None, read_bytes=RECEIVE_BYTES):
+    """
+    增量解码 16 位小端 PCM：每次读取一部分字节，产出完整的帧，不完整的帧留到下一次拼接。
+    :param data_size: 数据总字节数，None 表示读到流结束
+    :return: 生成器，产出形状为 (帧数, 声道数) 的 int16 数组
+    """
+    frame_bytes = 2 * n_channels
+    remaining = data_size
+    pending = b""
+    while remaining is None or remaining > 0:
+        data = reader.read(read_bytes if remaining is None else min(read_bytes, remaining))
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        data = pending + data
+        usable = len(data) - len(data) % frame_bytes
+        pending = data[usable:]
+        if usable:
+            yield np.frombuffer(data[:usable], dtype='<i2').reshape(-1, n_channels)
+
+
+class JitterBuffer:
+    """
+    有界抖动缓冲区：接收线程写入解码后的帧，播放端按块读取。
+    缓冲区满时写入方阻塞，经 TCP 流控把压力传回服务器，内存占用固定；
+    读空时播放端等待重新预缓冲到 prebuffer 帧，并记录一次缓冲不足。
+    """
+
+    def __init__(self, sample_rate, n_channels, capacity, prebuffer):
+        self.sample_rate = sample_rate
+        self.n_channels = n_channels
+        self.capacity = capacity
+        self.prebuffer = min(prebuffer, capacity)
+        self.underruns = 0  # 播放中缓冲区读空、需要重新预缓冲的次数
+        self.received_frames = 0
+        self.min_fill = None  # 开始播放后每次读取时的最小/最大填充量（帧）
+        self.max_fill = 0
+
+        self._ring = np.zeros((capacity, n_channels), dtype=np.int16)
+        self._read = 0
+        self._write = 0
+        self._eof = False
+        self._closed = False
+        self._buffering = True  # 预缓冲中：填充量达到 prebuffer 或流结束前读取方等待
+        self._cond = threading.Condition()
+
+    @property
+    def fill(self):
+        with self._cond:
+            return self._write - self._read
+
+    def write(self, frames):
+        """
+        写入帧，缓冲区满时等待空位。
+        :return: 缓冲区已关闭时返回 False
+        """
+        offset = 0
+        while offset < len(frames):
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._write - self._read < self.capacity)
+                if self._closed:
+                    return False
+                n = min(len(frames) - offset, self.capacity - (self._write - self._read))
+                start = self._write % self.capacity
+                first = min(n, self.capacity - start)
+                self._ring[start:start + first] = frames[offset:offset + first]
+                self._ring[:n - first] = frames[offset + first:offset + n]
+                self._write += n
+                self.received_frames += n
+                offset += n
+                self._cond.notify_all()
+        return True
+
+    def end_of_stream(self):
+        """
+        接收线程在流结束时调用，读取方取完剩余数据后得到空块。
+        """
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def close(self):
+        """
+        关闭缓冲区，唤醒所有等待中的读写方。
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def read(self, max_frames, timeout=None):
+        """
+        读取最多 max_frames 帧。预缓冲或重新预缓冲期间等待，超时返回 None。
+        :return: 形状为 (帧数, 声道数) 的 int16 数组；流结束且数据已取完时返回空数组
+        """
+        with self._cond:
+            if not self._buffering and self._write == self._read and not self._eof:
+                self._buffering = True
+                self.underruns += 1
+                perf_stats.increment("stream_underruns")
+            if not self._cond.wait_for(lambda: self._closed or self._eof or not self._buffering
+                                       or self._write - self._read >= self.prebuffer, timeout):
+                return None
+            self._buffering = False
+            fill = self._write - self._read
+            self.min_fill = fill if self.min_fill is None else min(self.min_fill, fill)
+            self.max_fill = max(self.max_fill, fill)
+
+            n = min(max_frames, fill)
+            start = self._read % self.capacity
+            first = min(n, self.capacity - start)
+            block = np.concatenate([self._ring[start:start + first], self._ring[:n - first]])
+            self._read += n
+            self._cond.notify_all()
+            return block
+
+
+class StreamSource:
+    """
+    网络音频流（HTTP/TCP）输入。
+    后台线程边接收边解码（WAV/16 位 PCM 直接解析，其他压缩格式经 ffmpeg 管道解码为 WAV），
+    解码后的帧写入有界抖动缓冲区，播放端用 read_block 按块取出。
+    开始播放只需等待预缓冲，首个音频的延迟与流的总长度无关。
+    """
+
+    def __init__(self, url, audio_format="auto", sample_rate=None, n_channels=None,
+                 buffer_seconds=2.0, prebuffer_seconds=0.25, timeout=10.0):
+        """
+        :param url: 'http://...'、'https://...' 或 'tcp://主机:端口'
+        :param audio_format: 'wav'、'pcm'（16 位小端裸数据）、'ffmpeg'（其他压缩格式）或 'auto'（按文件头判断）
+        :param sample_rate: 裸 PCM 的采样率
+        :param n_channels: 裸 PCM 的声道数
+        :param buffer_seconds: 抖动缓冲区容量（秒）
+        :param prebuffer_seconds: 开始播放和断流后恢复播放前需要缓冲的时长（秒）
+        :param timeout: 网络超时时间（秒）
+        """
+        self.url = url
+        self._open_time = time.perf_counter()
+        self.time_to_first_audio = None  # 从打开流到取出第一个非空块的时间（秒）
+        self.error = None  # 接收线程中发生的异常，出错后流按结束处理
+        self._ffmpeg = None
+        self._closing = False
+
+        reader = open_network_stream(url, timeout)
+        try:
+            if audio_format == "auto":
+                prefix = _read_exact(reader, 4)
+                reader = _PrefixedReader(prefix, reader)
+                audio_format = "wav" if prefix == b"RIFF" else "ffmpeg"
+            if audio_format == "ffmpeg":
+                reader = self._start_ffmpeg(reader)
+                audio_format = "wav"
+
+            if audio_format == "wav":
+                self.sample_rate, self.n_channels, data_size = read_wav_header(reader)
+            elif audio_format == "pcm":
+                if sample_rate is None or n_channels is None:
+                    raise ValueError("Raw PCM streams need sample_rate and n_channels.")
+                self.sample_rate, self.n_channels, data_size = sample_rate, n_channels, None
+            else:
+                raise ValueError(f"Unsupported stream format: {audio_format}")
+        except Exception:
+            reader.close()
+            raise
+
+        self._reader = reader
+        self.buffer = JitterBuffer(self.sample_rate, self.n_channels,
+                                   int(buffer_seconds * self.sample_rate), int(prebuffer_seconds * self.sample_rate))
+        self._receiver = threading.Thread(target=self._receive, args=(data_size,), daemon=True)
+        self._receiver.start()
+
+    def _start_ffmpeg(self, reader):
+        """
+        启动 ffmpeg 把压缩流解码为 WAV 输出到管道，由单独的线程把网络数据送入 ffmpeg。
+        """
+        try:
+            self._ffmpeg = subprocess.Popen(
+                ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-f", "wav", "-acodec", "pcm_s16le", "pipe:1"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError("ffmpeg is required to decode compressed streams.")
+
+        def feed():
+            try:
+                while True:
+                    data = reader.read(RECEIVE_BYTES)
+                    if not data:
+                        break
+                    self._ffmpeg.stdin.write(data)
+            except (OSError, ValueError):
+                pass  # ffmpeg 已退出或流已关闭
+            finally:
+                reader.close()
+                try:
+                    self._ffmpeg.stdin.close()
+                except OSError:
+                    pass
+
+        threading.Thread(target=feed, daemon=True).start()
+        return self._ffmpeg.stdout
+
+    def _receive(self, data_size):
+        """
+        接收线程：增量解码并写入抖动缓冲区，直到流结束或缓冲区关闭。
+        """
+        try:
+            for frames in iter_pcm_frames(self._reader, self.n_channels, data_size):
+                with perf_stats.stage("stream_receive", len(frames), frames.nbytes, self.sample_rate):
+                    if not self.buffer.write(frames):
+                        return
+        except Exception as e:
+            if not self._closing:  # 关闭时读取已关闭的连接出错属于正常情况
+                self.error = e
+        finally:
+            self.buffer.end_of_stream()
+
+    def read_block(self, max_frames, timeout=None):
+        """
+        从抖动缓冲区读取一个块，语义同 JitterBuffer.read。
+        """
+        block = self.buffer.read(max_frames, timeout)
+        if self.time_to_first_audio is None and block is not None and len(block):
+            self.time_to_first_audio = time.perf_counter() - self._open_time
+        return block
+
+    def stats(self):
+        """
+        返回缓冲区填充、延迟和断流统计。
+        latency_seconds 为缓冲区中尚未播放的音频时长，即网络数据到达后还要等待多久才被播放。
+        """
+        fill = self.buffer.fill
+        return {"fill_frames": fill,
+                "fill_ratio": fill / self.buffer.capacity,
+                "latency_seconds": fill / self.sample_rate,
+                "min_fill_seconds": None if self.buffer.min_fill is None else self.buffer.min_fill / self.sample_rate,
+                "max_fill_seconds": self.buffer.max_fill / self.sample_rate,
+                "underruns": self.buffer.underruns,
+                "received_seconds": self.buffer.received_frames / self.sample_rate,
+                "time_to_first_audio": self.time_to_first_audio}
+
+    def close(self):
+        self._closing = True
+        self.buffer.close()
+        self._reader.close()
+        if self._ffmpeg is not None:
+            self._ffmpeg.kill()
+            self._ffmpeg.wait()
+        self._receiver.join(timeout=1.0)
+
+
+def play_stream(source, stop_event, process_block=None, dither=False, chunk_size=1024, output=None):
+    """
+    播放网络音频流：从抖动缓冲区按块读取，经有状态滤波器（如 Filter.process_block）逐块滤波后写入声卡。
+    流结束、接收出错（错误保存在 source.error）或 stop_event 被设置时返回。
+    :param source: StreamSource
+    :param stop_event: threading.Event，用于控制停止播放
+    :param process_block: 可选函数，在写入声卡前对每个块进行滤波
+    :param dither: 量化为 int16 时是否加入抖动
+    :param chunk_size: 每块的帧数
+    :param output: 可选函数，接收每块量化后的 PCM 字节；None 时通过 PyAudio 输出到声卡
+    """
+    stream = p = None
+    if output is None:
+        p = pyaudio.PyAudio()
+        stream = p.open(format=pyaudio.paInt16, channels=source.n_channels, rate=source.sample_rate, output=True)
+        output = stream.write
+    pcm = np.empty((chunk_size, source.n_channels), dtype=np.int16)  # 预分配的量化输出缓冲区
+
+    try:
+        while not stop_event.is_set():
+            block = source.read_block(chunk_size, timeout=0.1)
+            if block is None:
+                continue  # 等待预缓冲时定期检查停止标志
+            if len(block) == 0:
+                break
+            if process_block is not None:
+                block = process_block(block)
+            with perf_stats.stage("quantize", len(block), block.nbytes, source.sample_rate):
+                chunk = quantize_to_int16(block, pcm[:len(block)], dither)
+            write_start = time.perf_counter()
+            output(chunk.tobytes())
+            perf_stats.record("stream_write", time.perf_counter() - write_start, len(chunk), chunk.nbytes,
+                              source.sample_rate)
+    finally:
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+
+
+def serve(path, port=8000, host="127.0.0.1", protocol="http", speed=1.0, jitter=0.0, chunk_bytes=4096):
+    """
+    本地测试用的替身服务器：把文件内容按 speed 倍实时速度发送（WAV 按其字节率限速，其他文件不限速），
+    每个数据块随机额外延迟 0~jitter 秒以模拟网络抖动。
+    :param protocol: 'http'（不带长度的 HTTP/1.0 响应）或 'tcp'（裸 TCP）
+    """
+    bytes_per_second = None
+    if path.endswith(".wav"):
+        with open(path, "rb") as f:
+            sample_rate, n_channels, _ = read_wav_header(f)
+        bytes_per_second = sample_rate * n_channels * 2 * speed
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            if protocol == "http":
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass  # 忽略请求行和请求头
+                self.wfile.write(b"HTTP/1.0 200 OK\r\nContent-Type: application/octet-stream\r\n\r\n")
+            start = time.perf_counter()
+            sent = 0
+            with open(path, "rb") as f:
+                while True:
+                    data = f.read(chunk_bytes)
+                    if not data:
+                        break
+                    if bytes_per_second:
+                        delay = start + sent / bytes_per_second - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    if jitter:
+                        time.sleep(random.uniform(0, jitter))
+                    try:
+                        self.wfile.write(data)
+                    except OSError:
+                        return  # 客户端已断开
+                    sent += len(data)
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+        print(f"正在 {protocol}://{host}:{port}/ 提供 {path}")
+        server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="播放 HTTP/TCP 网络音频流，或启动本地替身服务器")
+    parser.add_argument("source", help="流地址（http://、tcp://），或配合 --serve 给出要发送的文件")
+    parser.add_argument("--serve", action="store_true", help="作为本地替身服务器发送文件")
+    parser.add_argument("--protocol", choices=["http", "tcp"], default="http", help="替身服务器协议")
+    parser.add_argument("--port", type=int, default=8000, help="替身服务器端口")
+    parser.add_argument("--speed", type=float, default=1.0, help="替身服务器发送速度（实时倍数）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="替身服务器每块的最大随机延迟（秒）")
+    parser.add_argument("--format", dest="audio_format", default="auto", choices=["auto", "wav", "pcm", "ffmpeg"],
+                        help="流格式")
+    parser.add_argument("--rate", type=int, default=None, help="裸 PCM 的采样率")
+    parser.add_argument("--channels", type=int, default=None, help="裸 PCM 的声道数")
+    parser.add_argument("--buffer", type=float, default=2.0, help="抖动缓冲区容量（秒）")
+    parser.add_argument("--prebuffer", type=float, default=0.25, help="预缓冲时长（秒）")
+    parser.add_argument("--family", choices=["FIR", "IIR", "FFT"], default="IIR", help="滤波器实现")
+    parser.add_argument("--type", dest="filter_type", default="none",
+                        choices=["none", "lowpass", "highpass", "bandpass", "bandstop"], help="滤波器类型")
+    parser.add_argument("--cutoff", type=float, nargs="+", default=[1000.0], help="截止频率 (Hz)")
+    parser.add_argument("--order", type=int, default=None, help="滤波器阶数")
+    parser.add_argument("--no-play", action="store_true", help="不打开声卡，按实时速度消费数据（用于测试）")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.source, args.port, protocol=args.protocol, speed=args.speed, jitter=args.jitter)
+        return 0
+
+    from batch_process import make_filter
+    source = StreamSource(args.source, args.audio_format, args.rate, args.channels, args.buffer, args.prebuffer)
+    cutoff = args.cutoff[0] if len(args.cutoff) == 1 else args.cutoff
+    audio_filter = make_filter(source.sample_rate, args.family, args.filter_type, cutoff, args.order)
+    print(f"{source.url}: {source.sample_rate} Hz, {source.n_channels} 声道")
+
+    output = None
+    if args.no_play:
+        # 模拟声卡：每块按其时长等待，与真实播放的消费速度一致
+        def output(data):
+            time.sleep(len(data) / (2 * source.n_channels * source.sample_rate))
+
+    stop_event = threading.Event()
+    player = threading.Thread(target=play_stream, args=(source, stop_event, audio_filter.process_block),
+                              kwargs={"output": output}, daemon=True)
+    player.start()
+    try:
+        while player.is_alive():
+            player.join(1.0)
+            stats = source.stats()
+            first = stats["time_to_first_audio"]
+            print(f"缓冲 {stats['latency_seconds'] * 1000:6.0f} ms ({stats['fill_ratio']:4.0%}), "
+                  f"已接收 {stats['received_seconds']:7.1f} 秒, 断流 {stats['underruns']} 次, "
+                  f"首个音频 {'-' if first is None else f'{first * 1000:.0f} ms'}")
+    except KeyboardInterrupt:
+        stop_event.set()
+        player.join()
+    finally:
+        source.close()
+    if source.error is not None:
+        print(f"接收出错: {source.error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
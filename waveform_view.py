@@ -0,0 +1,290 @@
+import tkinter as tk
+from collections import OrderedDict
+import numpy as np
+
+
+class EnvelopePyramid:
+    """
+    波形的多分辨率最小/最大值包络（LOD 金字塔）。
+    第 0 层每 base_block 个样本保存一对最小/最大值，之后每层把 factor 个块合并为一个，
+    任意缩放级别都只需读取与屏幕像素数同数量级的数据。
+    """
+
+    def __init__(self, audio_data, base_block=256, factor=4):
+        self.base_block = base_block
+        self.factor = factor
+        self.n_samples = len(audio_data)
+        self.levels = []  # [(块大小, 最小值数组, 最大值数组)]
+        mins, maxs = self._base_envelope(audio_data, 0, self.n_samples)
+        block = base_block
+        self.levels.append((block, mins, maxs))
+        while len(mins) > 1:
+            starts = np.arange(0, len(mins), factor)
+            mins = np.minimum.reduceat(mins, starts)
+            maxs = np.maximum.reduceat(maxs, starts)
+            block *= factor
+            self.levels.append((block, mins, maxs))
+
+    def _base_envelope(self, audio_data, start, end):
+        """
+        计算 [start, end) 范围（需按 base_block 对齐）的第 0 层包络，多声道取所有声道的极值。
+        """
+        data = np.asarray(audio_data[start:end])
+        data = data.reshape(len(data), -1)
+        n_full = len(data) // self.base_block
+        full = data[:n_full * self.base_block].reshape(n_full, -1)
+        mins, maxs = full.min(axis=1), full.max(axis=1)
+        if n_full * self.base_block < len(data):
+            rest = data[n_full * self.base_block:]
+            mins = np.append(mins, rest.min())
+            maxs = np.append(maxs, rest.max())
+        return mins.astype(np.float32), maxs.astype(np.float32)
+
+    def update(self, audio_data, start, end):
+        """
+        音频 [start, end) 范围改变后，只重新计算受影响的块并逐层向上更新。
+        """
+        block0 = start // self.base_block
+        block1 = min(-(-end // self.base_block), len(self.levels[0][1]))
+        if block1 <= block0:
+            return
+        mins, maxs = self._base_envelope(audio_data, block0 * self.base_block,
+                                         min(block1 * self.base_block, self.n_samples))
+        self.levels[0][1][block0:block1] = mins
+        self.levels[0][2][block0:block1] = maxs
+
+        for level in range(1, len(self.levels)):
+            _, child_mins, child_maxs = self.levels[level - 1]
+            _, level_mins, level_maxs = self.levels[level]
+            block0 //= self.factor
+            block1 = -(-block1 // self.factor)
+            child0, child1 = block0 * self.factor, min(block1 * self.factor, len(child_mins))
+            starts = np.arange(0, child1 - child0, self.factor)
+            level_mins[block0:block1] = np.minimum.reduceat(child_mins[child0:child1], starts)
+            level_maxs[block0:block1] = np.maximum.reduceat(child_maxs[child0:child1], starts)
+
+    def envelope(self, audio_data, start, end, n_pixels):
+        """
+        返回 [start, end) 范围内每个像素列的最小/最大值。
+        选择块大小不超过每像素样本数的最粗一层；放大到单个块以内时直接读取原始样本。
+        """
+        samples_per_pixel = max((end - start) / n_pixels, 1)
+        if samples_per_pixel < self.base_block:
+            data = np.asarray(audio_data[start:end]).reshape(end - start, -1)
+            source_mins, source_maxs = data.min(axis=1), data.max(axis=1)
+            offset, block = start, 1
+        else:
+            for block, source_mins, source_maxs in reversed(self.levels):
+                if block <= samples_per_pixel:
+                    break
+            offset = start // block * block
+            first, last = start // block, -(-end // block)
+            source_mins, source_maxs = source_mins[first:last], source_maxs[first:last]
+
+        edges = ((start - offset) / block + np.arange(n_pixels) * samples_per_pixel / block).astype(np.int64)
+        edges = np.unique(np.clip(edges, 0, len(source_mins) - 1))
+        return np.minimum.reduceat(source_mins, edges), np.maximum.reduceat(source_maxs, edges)
+
+
+class SpectrogramCache:
+    """
+    分块计算并缓存的频谱图：每 n_fft 个样本为一帧，帧按索引缓存（LRU），
+    音频局部更新时只使已改变的帧失效。
+    """
+
+    def __init__(self, sample_rate, n_fft=1024, max_frames=20000):
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.max_frames = max_frames
+        self.window = np.hanning(n_fft).astype(np.float32)
+        self._frames = OrderedDict()
+
+    def frame(self, audio_data, index):
+        """
+        返回第 index 帧的幅度谱（dB）。
+        """
+        if index in self._frames:
+            self._frames.move_to_end(index)
+            return self._frames[index]
+        data = np.asarray(audio_data[index * self.n_fft:(index + 1) * self.n_fft], dtype=np.float32)
+        data = data.reshape(len(data), -1).mean(axis=1)
+        segment = np.zeros(self.n_fft, dtype=np.float32)
+        segment[:len(data)] = data
+        spectrum = 20 * np.log10(np.abs(np.fft.rfft(segment * self.window)) + 1e-3)
+        self._frames[index] = spectrum
+        if len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+        return spectrum
+
+    def invalidate(self, start, end):
+        """
+        使覆盖 [start, end) 的帧失效。
+        """
+        first, last = start // self.n_fft, -(-end // self.n_fft)
+        for index in [index for index in self._frames if first <= index < last]:
+            del self._frames[index]
+
+    def image(self, audio_data, start, end, n_columns):
+        """
+        返回 [start, end) 范围的频谱图，形状为 (频点数, 列数)，每列取均匀间隔的一帧。
+        """
+        first, last = start // self.n_fft, max(-(-end // self.n_fft), start // self.n_fft + 1)
+        indices = np.unique(np.linspace(first, last - 1, min(n_columns, last - first)).astype(np.int64))
+        return np.stack([self.frame(audio_data, index) for index in indices], axis=1)
+
+
+class WaveformView(tk.Frame):
+    """
+    嵌入主窗口的波形/频谱查看器：滚轮缩放、拖动平移，并显示播放位置。
+    """
+
+    def __init__(self, master, width=600, wave_height=120, spec_height=96):
+        super().__init__(master)
+        self.width = width
+        self.wave_height = wave_height
+        self.spec_height = spec_height
+        self.wave_canvas = tk.Canvas(self, width=width, height=wave_height, bg="black")
+        self.wave_canvas.pack()
+        self.spec_canvas = tk.Canvas(self, width=width, height=spec_height, bg="black")
+        self.spec_canvas.pack()
+        self.spec_image = tk.PhotoImage(width=width, height=spec_height)
+        self.spec_canvas.create_image(0, 0, image=self.spec_image, anchor=tk.NW)
+
+        self.audio_data = None
+        self.pyramid = None
+        self.spectrogram = None
+        self.view_start = 0
+        self.view_end = 0
+        self.playhead = 0
+        self._drag_x = None
+        self._redraw_pending = False  # 已安排空闲时重绘，连续的拖动/滚轮事件只重绘一次
+
+        for canvas in (self.wave_canvas, self.spec_canvas):
+            canvas.bind("<MouseWheel>", self._on_wheel)
+            canvas.bind("<Button-4>", lambda e: self._zoom(e.x, 0.8))
+            canvas.bind("<Button-5>", lambda e: self._zoom(e.x, 1.25))
+            canvas.bind("<ButtonPress-1>", self._on_press)
+            canvas.bind("<B1-Motion>", self._on_drag)
+
+    def set_audio(self, audio_data, sample_rate):
+        """
+        显示新的音频，重建包络金字塔和频谱缓存。
+        """
+        if len(audio_data) == 0:
+            return
+        self.audio_data = audio_data
+        self.pyramid = EnvelopePyramid(audio_data)
+        self.spectrogram = SpectrogramCache(sample_rate)
+        self.view_start, self.view_end = 0, len(audio_data)
+        self.playhead = 0
+        self.redraw()
+
+    def clear(self):
+        """
+        清空显示（新文件尚未解码完成时使用）。
+        """
+        self.audio_data = None
+        self.pyramid = None
+        self.spectrogram = None
+        self.view_start = self.view_end = 0
+        self.wave_canvas.delete("wave")
+        self.spec_image.blank()
+        self._draw_playhead()
+
+    def update_region(self, audio_data, start, end):
+        """
+        音频 [start, end) 范围被新的滤波结果替换后，增量更新显示。
+        """
+        if self.pyramid is None or len(audio_data) != self.pyramid.n_samples:
+            return
+        self.audio_data = audio_data
+        self.pyramid.update(audio_data, start, end)
+        self.spectrogram.invalidate(start, end)
+        if start < self.view_end and end > self.view_start:
+            self.redraw()
+
+    def set_playhead(self, position):
+        self.playhead = position
+        self._draw_playhead()
+
+    def request_redraw(self):
+        """
+        在事件队列空闲时重绘：拖动和滚轮事件很密集，合并为一次重绘，避免事件堆积。
+        """
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._idle_redraw)
+
+    def _idle_redraw(self):
+        self._redraw_pending = False
+        self.redraw()
+
+    def redraw(self):
+        if self.audio_data is None or self.view_end <= self.view_start:
+            return
+        self._draw_waveform()
+        self._draw_spectrogram()
+        self._draw_playhead()
+
+    def _draw_waveform(self):
+        self.wave_canvas.delete("wave")
+        mins, maxs = self.pyramid.envelope(self.audio_data, self.view_start, self.view_end, self.width)
+        x = np.linspace(0, self.width, len(mins))
+        mid = self.wave_height / 2
+        scale = mid / 32768
+        top = np.column_stack([x, mid - maxs * scale]).ravel()
+        bottom = np.column_stack([x[::-1], mid - mins[::-1] * scale]).ravel()
+        self.wave_canvas.create_polygon(*np.concatenate([top, bottom]).tolist(), fill="#3fa7ff",
+                                        outline="#3fa7ff", tags="wave")
+
+    def _draw_spectrogram(self):
+        image = self.spectrogram.image(self.audio_data, self.view_start, self.view_end, self.width)
+        # 频点缩放到画布高度（低频在下），列拉伸到画布宽度
+        rows = np.linspace(image.shape[0] - 1, 0, self.spec_height).astype(np.int64)
+        cols = np.linspace(0, image.shape[1] - 1, self.width).astype(np.int64)
+        levels = np.clip((image[rows][:, cols] - 20) / 100, 0, 1)
+        red = (levels * 255).astype(np.uint8)
+        blue = ((1 - levels) * 96).astype(np.uint8)
+        # 用 numpy 直接拼出二进制 PPM 交给 Tk 解析，避免逐像素生成颜色字符串
+        rgb = np.empty((self.spec_height, self.width, 3), dtype=np.uint8)
+        rgb[..., 0] = red
+        rgb[..., 1] = red // 2
+        rgb[..., 2] = blue
+        header = f"P6\n{self.width} {self.spec_height}\n255\n".encode("ascii")
+        self.spec_image.configure(data=header + rgb.tobytes(), format="ppm")
+
+    def _draw_playhead(self):
+        self.wave_canvas.delete("playhead")
+        self.spec_canvas.delete("playhead")
+        if not self.view_start <= self.playhead < self.view_end:
+            return
+        x = (self.playhead - self.view_start) / (self.view_end - self.view_start) * self.width
+        self.wave_canvas.create_line(x, 0, x, self.wave_height, fill="white", tags="playhead")
+        self.spec_canvas.create_line(x, 0, x, self.spec_height, fill="white", tags="playhead")
+
+    def _zoom(self, x, ratio):
+        if self.audio_data is None:
+            return
+        span = self.view_end - self.view_start
+        anchor = self.view_start + x / self.width * span
+        new_span = int(min(max(span * ratio, self.width), len(self.audio_data)))
+        start = int(anchor - x / self.width * new_span)
+        self.view_start = min(max(start, 0), len(self.audio_data) - new_span)
+        self.view_end = self.view_start + new_span
+        self.request_redraw()
+
+    def _on_wheel(self, event):
+        self._zoom(event.x, 0.8 if event.delta > 0 else 1.25)
+
+    def _on_press(self, event):
+        self._drag_x = event.x
+
+    def _on_drag(self, event):
+        if self.audio_data is None or self._drag_x is None:
+            return
+        span = self.view_end - self.view_start
+        shift = int((self._drag_x - event.x) / self.width * span)
+        self._drag_x = event.x
+        self.view_start = min(max(self.view_start + shift, 0), len(self.audio_data) - span)
+        self.view_end = self.view_start + span
+        self.request_redraw()